@@ -4,6 +4,7 @@ from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field, validator
 from typing import Optional
 from talking_head.generate_video import generate_talking_video, MEDIA_DIR
+from talking_head.job_api import router as talking_head_jobs_router, run_talking_head_job
 import os
 import logging
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -24,6 +25,8 @@ limiter = Limiter(key_func=get_remote_address)
 app = FastAPI(title="SadTalker API", description="API for generating talking head videos")
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Asynchronous talking head jobs (submit, poll, SSE progress)
+app.include_router(talking_head_jobs_router)
 
 # CORS middleware configuration
 origins = [
@@ -191,7 +194,8 @@ async def generate_talking_video_endpoint(request_data: TextInput, request: Requ
     try:
         # Call the core generation function
         start_time = time.time()
-        video_path = generate_talking_video(request_data.summary_text)
+        # Render on the bounded job executor so the event loop stays free
+        video_path = (await run_talking_head_job(request_data.summary_text))["video_path"]
         end_time = time.time()
         processing_time = end_time - start_time
 
@@ -215,6 +219,8 @@ async def generate_talking_video_endpoint(request_data: TextInput, request: Requ
             logging.error("Video generation function returned None or file not found.")
             raise HTTPException(status_code=500, detail="Video generation failed internally.")
 
+    except HTTPException:
+        raise
     except FileNotFoundError as e:
          logging.error(f"File not found error during generation: {e}", exc_info=True)
          raise HTTPException(status_code=500, detail=f"Server configuration error: {e}")
@@ -306,7 +312,7 @@ async def generate_from_source(
             raise FileNotFoundError(f"Source image not found: {source_image_path}")
         
         # Generate the talking head video
-        video_path = generate_talking_video(summary_text, source_image_path)
+        video_path = (await run_talking_head_job(summary_text, source_image_path))["video_path"]
         end_time = time.time()
         processing_time = end_time - start_time
         
@@ -325,6 +331,8 @@ async def generate_from_source(
             }
         else:
             raise HTTPException(status_code=500, detail="Video generation failed")
+    except HTTPException:
+        raise
     except FileNotFoundError as e:
         logging.error(f"File not found: {e}", exc_info=True)
         raise HTTPException(status_code=404, detail=str(e))
@@ -9,45 +9,40 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import APIKeyHeader
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from supabase import create_client, Client
-from supabase.lib.client_options import ClientOptions
-from moviepy.editor import VideoFileClip
 import tempfile
 import logging
-import yt_dlp
 import re
 from pydantic import BaseModel, Field, validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from youtube_transcript_api import YouTubeTranscriptApi
-from pytube import YouTube
 import json
 import requests
 from backend.model_processor import model_processor
+from backend.processing_cache import processing_cache
+from model.src.app.model_registry import registry as model_registry, get_model
 import base64
 import traceback
 import sys
-import whisper
-from gtts import gTTS
-import spacy
-from transformers import pipeline
 import subprocess
-from backend.groq_utils import groq_chat
-from backend.gemini_utils import gemini_generate_flashcards, gemini_generate_quizzes, gemini_video_chat
-from backend.mistral_utils import mistral_generate_suggestions, mistral_chat
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import time
 import shutil
 import uuid
+import hashlib
+import asyncio
+import threading
 # Add the backend directory to Python path to allow imports
 backend_dir = os.path.dirname(os.path.abspath(__file__))
 if backend_dir not in sys.path:
     sys.path.insert(0, backend_dir)
 # Import talking head video generator modules
-from talking_head.generate_video import generate_talking_video, MEDIA_DIR
+from talking_head.generate_video import MEDIA_DIR
+from talking_head.job_api import router as talking_head_jobs_router, run_talking_head_job
+from talking_head.segmented import set_sentence_splitter
 from talking_head.tts import text_to_speech_mock
+from talking_head.utils import sha256_file
 
 # Set up logging
 logging.basicConfig(
@@ -71,6 +66,8 @@ limiter = Limiter(key_func=get_remote_address)
 app = FastAPI()
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Asynchronous talking head jobs (submit, poll, SSE progress)
+app.include_router(talking_head_jobs_router)
 
 # Ensure MEDIA_DIR exists
 os.makedirs(MEDIA_DIR, exist_ok=True)
@@ -124,18 +121,53 @@ print("GROQ_API_KEY:", groq_api_key)
 if not all([supabase_url, supabase_key, groq_api_key]):
     raise ValueError("Missing required environment variables")
 
-# Initialize Supabase client with service role key
-options = ClientOptions()
-supabase: Client = create_client(
-    supabase_url,
-    supabase_key,
-    options
-)
+_supabase = None
+_supabase_lock = threading.Lock()
+
+def get_supabase():
+    """
+    Return the Supabase client (service role key), creating it on first use.
 
-# Load models once at startup
-whisper_model = whisper.load_model("base")
-summarizer = pipeline("summarization")
-nlp = spacy.load("en_core_web_sm")
+    The supabase package and its HTTP stack are imported here rather than at
+    module load, so they stay off the startup path.
+    """
+    global _supabase
+    with _supabase_lock:
+        if _supabase is None:
+            from supabase import create_client
+            from supabase.lib.client_options import ClientOptions
+            _supabase = create_client(supabase_url, supabase_key, ClientOptions())
+        return _supabase
+
+# Whisper, BART and spaCy are shared through the model registry and load on first use.
+# WARMUP_MODE: "background" loads them in a thread after startup (default), "eager"
+# loads them before the server accepts requests, "lazy" waits for the first request.
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background")
+WARMUP_MODELS = ["spacy", "summarizer", "whisper"]
+
+@app.on_event("startup")
+async def warm_up_models():
+    if WARMUP_MODE == "eager":
+        await asyncio.to_thread(model_registry.warm_up, WARMUP_MODELS)
+    elif WARMUP_MODE == "background":
+        model_registry.warm_up_in_background(WARMUP_MODELS)
+
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving requests."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """Ready once model warm-up finished; 503 while models are still loading or failed."""
+    warmup = model_registry.warmup_status()
+    ready = WARMUP_MODE == "lazy" or warmup["state"] == "ready"
+    return JSONResponse(status_code=200 if ready else 503, content={
+        "status": "ready" if ready else warmup["state"],
+        "warmup_mode": WARMUP_MODE,
+        "warmup": warmup,
+        "models": model_registry.status()
+    })
 
 # Enhanced Pydantic models with validation
 class ChatMessage(BaseModel):
@@ -192,6 +224,7 @@ def download_youtube_frame(youtube_url: str, start_time: int = 0) -> str:
     os.makedirs(output_dir, exist_ok=True)
     
     try:
+        from pytube import YouTube
         yt = YouTube(youtube_url)
         video_stream = yt.streams.filter(progressive=True, file_extension="mp4").first()
         
@@ -236,7 +269,8 @@ async def generate_talking_video_endpoint(request_data: TextInput, request: Requ
     try:
         # Call the core generation function
         start_time = time.time()
-        result = generate_talking_video(request_data.summary_text)
+        # Render on the bounded job executor so the event loop stays free
+        result = (await run_talking_head_job(request_data.summary_text))["video_path"]
         end_time = time.time()
         processing_time = end_time - start_time
 
@@ -275,6 +309,8 @@ async def generate_talking_video_endpoint(request_data: TextInput, request: Requ
             logging.error("Video generation function returned None or file not found.")
             raise HTTPException(status_code=500, detail="Video generation failed internally.")
 
+    except HTTPException:
+        raise
     except FileNotFoundError as e:
          logging.error(f"File not found error during generation: {e}", exc_info=True)
          raise HTTPException(status_code=500, detail=f"Server configuration error: {e}")
@@ -306,17 +342,23 @@ async def error_handling_middleware(request: Request, call_next):
 async def chat(message: ChatMessage, request: Request):
     try:
         print("[DEBUG] Received chat message:", message, flush=True)
+        from backend.groq_utils import groq_chat
         response = groq_chat(message.message)
         return {"data": response}
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/models")
+async def get_models_status():
+    """Which ML models are loaded, how long they took and how much memory they use."""
+    return model_registry.status()
+
 @app.get("/spaces")
 @limiter.limit("30/minute")
 async def get_spaces(user_id: str, request: Request):
     try:
-        response = supabase.table("spaces").select("*").eq("user_id", user_id).execute()
+        response = get_supabase().table("spaces").select("*").eq("user_id", user_id).execute()
         return response.data
     except Exception as e:
         logger.error(f"Error getting spaces: {str(e)}")
@@ -330,12 +372,12 @@ async def create_space(space: Space, user_id: str = None, request: Request = Non
         
     try:
         # Verify user exists
-        user_response = supabase.auth.admin.get_user_by_id(user_id)
+        user_response = get_supabase().auth.admin.get_user_by_id(user_id)
         if not user_response.user:
             raise HTTPException(status_code=404, detail="User not found")
 
         # Create space with service role
-        response = supabase.table("spaces").insert({
+        response = get_supabase().table("spaces").insert({
             "name": space.name,
             "description": space.description,
             "user_id": user_id
@@ -362,19 +404,19 @@ async def delete_space(space_id: str, user_id: str, request: Request):
         
     try:
         # First, verify the space exists and belongs to the user
-        space_response = supabase.table("spaces").select("*").eq("id", space_id).eq("user_id", user_id).execute()
+        space_response = get_supabase().table("spaces").select("*").eq("id", space_id).eq("user_id", user_id).execute()
         
         if not space_response.data:
             raise HTTPException(status_code=404, detail="Space not found or you don't have permission to delete it")
         
         # Delete related space_topics entries first (if they exist)
         try:
-            supabase.table("space_topics").delete().eq("space_id", space_id).execute()
+            get_supabase().table("space_topics").delete().eq("space_id", space_id).execute()
         except Exception as e:
             logger.warning(f"Could not delete space_topics for space {space_id}: {str(e)}")
         
         # Delete the space
-        response = supabase.table("spaces").delete().eq("id", space_id).eq("user_id", user_id).execute()
+        response = get_supabase().table("spaces").delete().eq("id", space_id).eq("user_id", user_id).execute()
         
         if not response.data:
             raise HTTPException(status_code=500, detail="Failed to delete space")
@@ -391,7 +433,7 @@ async def get_topics(space_id: Optional[str] = None):
     if space_id:
         # Get topics for a specific space through the space_topics junction table
         try:
-            response = supabase.table("space_topics").select(
+            response = get_supabase().table("space_topics").select(
                 "topics(*)"
             ).eq("space_id", space_id).execute()
             
@@ -408,7 +450,7 @@ async def get_topics(space_id: Optional[str] = None):
     else:
         # Get all topics
         try:
-            response = supabase.table("topics").select("*").execute()
+            response = get_supabase().table("topics").select("*").execute()
             return response.data
         except Exception as e:
             logger.warning(f"Could not query topics table: {str(e)}")
@@ -418,7 +460,7 @@ async def get_topics(space_id: Optional[str] = None):
 @app.post("/topics/{space_id}")
 async def add_topic_to_space(space_id: str, topic_id: str):
     try:
-        response = supabase.table("space_topics").insert({
+        response = get_supabase().table("space_topics").insert({
             "space_id": space_id,
             "topic_id": topic_id
         }).execute()
@@ -430,7 +472,7 @@ async def add_topic_to_space(space_id: str, topic_id: str):
 @app.get("/user/topics/{user_id}")
 async def get_user_topics(user_id: str):
     try:
-        response = supabase.table("user_topics").select(
+        response = get_supabase().table("user_topics").select(
             "*, topics(*)").eq("user_id", user_id).execute()
         return response.data
     except Exception as e:
@@ -455,7 +497,7 @@ async def update_user_topic(
         if progress is not None:
             data["progress"] = progress
 
-        response = supabase.table("user_topics").upsert(data).execute()
+        response = get_supabase().table("user_topics").upsert(data).execute()
         return response.data[0]
     except Exception as e:
         logger.error(f"Error updating user topic: {str(e)}")
@@ -463,6 +505,7 @@ async def update_user_topic(
 
 def download_youtube_video(url: str) -> str:
     """Download a YouTube video and return the path to the downloaded file."""
+    import yt_dlp
     # First, check if yt-dlp is up to date, as YouTube often changes their API
     try:
         subprocess.run(["pip", "install", "--upgrade", "yt-dlp"], capture_output=True, check=True)
@@ -591,20 +634,61 @@ def is_valid_flashcards(flashcards: list) -> bool:
 def is_valid_quiz(quizzes: list) -> bool:
     return quizzes and not (isinstance(quizzes[0], dict) and quizzes[0].get("question", "").startswith("Quiz not available"))
 
+def is_cacheable_result(result: tuple) -> bool:
+    """Only complete results are cached, so a failed AI call is retried next time."""
+    transcript, summary, audio_bytes, flashcards, quizzes, notes, content = result
+    # Template content from a failed enhanced generation must not be stored under the enhanced key
+    if content != model_processor.versions()["content"]:
+        return False
+    return bool(is_valid_summary(summary) and is_valid_flashcards(flashcards) and is_valid_quiz(quizzes))
+
+# Uploads are copied to disk in chunks of this size instead of being read into memory
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+async def spool_upload(upload: UploadFile, suffix: str = ".mp4") -> tuple[str, str]:
+    """
+    Stream an upload to a temporary file in fixed-size chunks.
+
+    Returns:
+        tuple: (path, sha256 hex digest of the content). The caller deletes the file.
+    """
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        try:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                temp_file.write(chunk)
+        except BaseException:
+            temp_file.close()
+            os.unlink(temp_file.name)
+            raise
+    return temp_file.name, digest.hexdigest()
+
 @app.post("/process-video/{video_id}")
 async def process_video(video_id: str, video: UploadFile = File(...)):
+    spooled_path = None
     try:
-        # Read video bytes
         if not video:
             raise HTTPException(status_code=400, detail="No video file provided")
         if isinstance(video, str):
-            with open(video, "rb") as f:
-                video_bytes = f.read()
+            # Internal callers pass a file that is already on disk
+            video_path = video
+            content_sha256 = await asyncio.to_thread(sha256_file, video_path)
         else:
-            video_bytes = await video.read()
-        # Process video
-        print("[DEBUG] Calling model_processor.process_video")
-        transcript, summary, audio_bytes, flashcards, quizzes, notes = await model_processor.process_video(video_bytes)
+            suffix = os.path.splitext(video.filename or "")[1] or ".mp4"
+            spooled_path, content_sha256 = await spool_upload(video, suffix)
+            video_path = spooled_path
+        # Process video, unless identical content was already processed by the same models
+        print("[DEBUG] Calling model_processor.process_video_file")
+        cache_key = processing_cache.key_for("sha256", content_sha256, model_processor.versions())
+        result, cache_hit = await processing_cache.get_or_process(
+            cache_key, lambda: model_processor.process_video_file(video_path), should_cache=is_cacheable_result
+        )
+        transcript, summary, audio_bytes, flashcards, quizzes, notes, content = result
+        logger.info(f"Processed video {content_sha256[:12]} (cache {'hit' if cache_hit else 'miss'})")
         print("[DEBUG] Model output:", {
             "transcript": transcript,
             "summary": summary,
@@ -617,8 +701,8 @@ async def process_video(video_id: str, video: UploadFile = File(...)):
         audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
         print(f"[DEBUG] Updating video {video_id} with summary: {summary[:100]}")
         # Only update Supabase if all are valid
-        if is_valid_summary(summary) and is_valid_flashcards(flashcards) and is_valid_quiz(quizzes):
-            supabase.table("videos").update({
+        if video_id and is_valid_summary(summary) and is_valid_flashcards(flashcards) and is_valid_quiz(quizzes):
+            get_supabase().table("videos").update({
                 "summary": summary,
                 "flashcards": flashcards,
                 "quizzes": quizzes,
@@ -637,8 +721,13 @@ async def process_video(video_id: str, video: UploadFile = File(...)):
             "notes": notes,
             "title": "Processed Video"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if spooled_path and os.path.exists(spooled_path):
+            os.unlink(spooled_path)
 
 def extract_youtube_id(url: str) -> Optional[str]:
     """Extract YouTube video ID from URL."""
@@ -653,6 +742,7 @@ def extract_youtube_id(url: str) -> Optional[str]:
 def get_video_transcript(youtube_id: str) -> str:
     """Get video transcript using YouTube Transcript API."""
     try:
+        from youtube_transcript_api import YouTubeTranscriptApi
         transcript_list = YouTubeTranscriptApi.get_transcript(youtube_id)
         return " ".join([entry["text"] for entry in transcript_list])
     except Exception as e:
@@ -662,6 +752,7 @@ def get_video_transcript(youtube_id: str) -> str:
 def get_video_info(youtube_id: str) -> dict:
     """Get video information using pytube."""
     try:
+        from pytube import YouTube
         yt = YouTube(f"https://www.youtube.com/watch?v={youtube_id}")
         return {
             "title": yt.title,
@@ -682,14 +773,28 @@ async def process_youtube(request: Request):
         if not youtube_id:
             logger.error(f"Invalid YouTube URL: {video_req.youtubeUrl}")
             raise HTTPException(status_code=400, detail="Invalid YouTube URL")
-        # Download YouTube video to temp file
-        temp_path = download_youtube_video(video_req.youtubeUrl)
-        logger.info(f"YouTube video downloaded to: {temp_path}")
-        with open(temp_path, "rb") as f:
-            video_bytes = f.read()
-        # Process video with model
-        print("[DEBUG] Calling model_processor.process_video", flush=True)
-        transcript, summary, audio_bytes, flashcards, quizzes, notes = await model_processor.process_video(video_bytes)
+        async def download_and_process():
+            # Download YouTube video to temp file
+            temp_path = download_youtube_video(video_req.youtubeUrl)
+            logger.info(f"YouTube video downloaded to: {temp_path}")
+            try:
+                # Process the downloaded file in place
+                print("[DEBUG] Calling model_processor.process_video_file", flush=True)
+                return await model_processor.process_video_file(temp_path)
+            finally:
+                # Clean up temporary file
+                try:
+                    os.remove(temp_path)
+                except Exception as e:
+                    logger.warning(f"Error cleaning up temporary files: {str(e)}")
+
+        # A video already processed by the same models is served without downloading it again
+        cache_key = processing_cache.key_for("youtube", youtube_id, model_processor.versions())
+        result, cache_hit = await processing_cache.get_or_process(
+            cache_key, download_and_process, should_cache=is_cacheable_result
+        )
+        transcript, summary, audio_bytes, flashcards, quizzes, notes, content = result
+        logger.info(f"Processed YouTube video {youtube_id} (cache {'hit' if cache_hit else 'miss'})")
         print("[DEBUG] Model output:", {
             "transcript": transcript,
             "summary": summary,
@@ -720,14 +825,14 @@ async def process_youtube(request: Request):
             print(f"[DEBUG] About to update video with id={video_req.videoId}", flush=True)
             try:
                 # First try to find the video by YouTube ID
-                response = supabase.table("videos").select("*").eq("youtube_id", video_req.videoId).execute()
+                response = get_supabase().table("videos").select("*").eq("youtube_id", video_req.videoId).execute()
                 if response.data and len(response.data) > 0:
                     # Update existing video
                     video_id = response.data[0]['id']
-                    response = supabase.table("videos").update(update_payload).eq("id", video_id).execute()
+                    response = get_supabase().table("videos").update(update_payload).eq("id", video_id).execute()
                 else:
                     # Insert new video
-                    response = supabase.table("videos").insert(update_payload).execute()
+                    response = get_supabase().table("videos").insert(update_payload).execute()
                 
                 print("[DEBUG] Supabase update response:", response, flush=True)
                 if hasattr(response, 'data'):
@@ -744,12 +849,6 @@ async def process_youtube(request: Request):
             print(f"[DEBUG] Not updating Supabase for video {video_req.videoId} due to invalid AI results.")
             raise HTTPException(status_code=500, detail="Failed to generate valid AI results")
         
-        # Clean up temporary file
-        try:
-            os.remove(temp_path)
-        except Exception as e:
-            logger.warning(f"Error cleaning up temporary files: {str(e)}")
-        
         return {
             "transcript": transcript,
             "summary": summary,
@@ -767,7 +866,7 @@ async def process_youtube(request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 def split_into_chunks(text, max_length=500):
-    doc = nlp(text)
+    doc = get_model("spacy")(text)
     chunks, chunk = [], ''
     for sent in doc.sents:
         if len(chunk) + len(sent.text) <= max_length:
@@ -779,6 +878,9 @@ def split_into_chunks(text, max_length=500):
         chunks.append(chunk.strip())
     return chunks
 
+# Long talking head summaries are segmented at spaCy sentence boundaries
+set_sentence_splitter(split_into_chunks)
+
 def generate_talking_head_video(audio_path: str, face_path: str, output_path: str):
     """Generate a talking head video using SadTalker."""
     # Path to our batch file that properly activates the SadTalker environment
@@ -821,18 +923,15 @@ async def process_video_with_talking_head(
                 detail="Invalid file format. Only MP4, MOV, and AVI files are supported."
             )
 
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_video:
-            content = await video.read()
-            temp_video.write(content)
-            temp_video_path = temp_video.name
+        # Spool the upload to a temporary file without holding it in memory
+        temp_video_path, _ = await spool_upload(video, os.path.splitext(video.filename)[1])
 
         try:
             # Check file existence before processing
             if not temp_video_path or not os.path.exists(temp_video_path):
                 raise HTTPException(status_code=400, detail="Temporary video file not found")
-            # Process video
-            result = await process_video(temp_video_path, user_id)
+            # Process video (there is no stored video row to update for this upload)
+            result = await process_video(None, temp_video_path)
             return result
         finally:
             # Cleanup
@@ -844,16 +943,19 @@ async def process_video_with_talking_head(
 
 @app.post("/generate-flashcards")
 async def generate_flashcards_api(summary: str):
+    from backend.gemini_utils import gemini_generate_flashcards
     flashcards = gemini_generate_flashcards(summary)
     return {"flashcards": flashcards}
 
 @app.post("/generate-quizzes")
 async def generate_quizzes_api(summary: str):
+    from backend.gemini_utils import gemini_generate_quizzes
     quizzes = gemini_generate_quizzes(summary)
     return {"quizzes": quizzes}
 
 @app.post("/video-chat")
 async def video_chat_api(req: VideoChatRequest):
+    from backend.gemini_utils import gemini_video_chat
     answer = gemini_video_chat(req.summary, req.message)
     return {"response": answer}
 
@@ -938,7 +1040,7 @@ async def generate_from_source(
             raise FileNotFoundError(f"Source image not found: {source_image_path}")
         
         # Generate the talking head video
-        result = generate_talking_video(summary_text, source_image_path)
+        result = (await run_talking_head_job(summary_text, source_image_path))["video_path"]
         end_time = time.time()
         processing_time = end_time - start_time
         
@@ -972,6 +1074,8 @@ async def generate_from_source(
             }
         else:
             raise HTTPException(status_code=500, detail="Video generation failed")
+    except HTTPException:
+        raise
     except FileNotFoundError as e:
         logging.error(f"File not found: {e}", exc_info=True)
         raise HTTPException(status_code=404, detail=str(e))
@@ -987,7 +1091,7 @@ async def get_talking_head_for_video(video_id: str, request: Request):
     """
     try:
         # First try to find the video by ID
-        response = supabase.table("videos").select("*").eq("id", video_id).execute()
+        response = get_supabase().table("videos").select("*").eq("id", video_id).execute()
         
         if not response.data or len(response.data) == 0:
             raise HTTPException(status_code=404, detail=f"Video with ID {video_id} not found")
@@ -1000,7 +1104,7 @@ async def get_talking_head_for_video(video_id: str, request: Request):
         
         # Generate talking head video
         start_time = time.time()
-        result = generate_talking_video(summary)
+        result = (await run_talking_head_job(summary))["video_path"]
         end_time = time.time()
         processing_time = end_time - start_time
         
@@ -1029,7 +1133,7 @@ async def get_talking_head_for_video(video_id: str, request: Request):
             # Try to update video record with talking head URL
             # But catch the error if the column doesn't exist
             try:
-                supabase.table("videos").update({
+                get_supabase().table("videos").update({
                     "talking_head_url": video_url
                 }).eq("id", video_id).execute()
                 logging.info(f"Updated video {video_id} with talking head URL: {video_url}")
@@ -1061,6 +1165,7 @@ async def mistral_chat_endpoint(request_data: MistralChatRequest, request: Reque
     try:
         logger.info(f"Mistral chat request: {request_data.message[:100]}...")
         
+        from backend.mistral_utils import mistral_chat
         response = await mistral_chat(request_data.message)
         
         return {
@@ -1089,6 +1194,7 @@ async def mistral_suggestions_endpoint(request_data: MistralSuggestionsRequest,
     try:
         logger.info(f"Mistral suggestions request for transcript length: {len(request_data.transcript)}")
         
+        from backend.mistral_utils import mistral_generate_suggestions
         suggestions = await mistral_generate_suggestions(request_data.transcript)
         
         return {
@@ -1,99 +1,200 @@
-import io
 import os
 from pathlib import Path
 # import fleep  # Not needed
-from moviepy.editor import VideoFileClip
-import whisper
-from transformers import pipeline
-import torch
-from gtts import gTTS
+import numpy as np
+import subprocess
 import sys
 import re
 import random
+import shutil
+import asyncio
+import tempfile
+import threading
 
 # Import model functions
 import sys
 sys.path.append('..')  # Add parent directory to path
 from model.src.app.speech import extract_audio, transcribe
 from model.src.app.summarizer import summarize_text
+from model.src.app.audio_cache import synthesize_text, pcm_to_mp3
+from model.src.app.model_registry import get_model, WHISPER_MODEL_NAME, SUMMARIZER_MODEL_NAME, MODEL_QUANTIZATION
 
-# Import enhanced content generation
 try:
-    from .enhanced_openai_utils import generate_enhanced_content, AdvancedContentGenerator
+    from .whisper_engine import WhisperEngine
 except ImportError:
-    try:
-        from enhanced_openai_utils import generate_enhanced_content, AdvancedContentGenerator
-    except ImportError:
-        print("Warning: enhanced_openai_utils not available, using fallback generation")
-        AdvancedContentGenerator = None
+    from whisper_engine import WhisperEngine
+
+_content_generator_class = None
+_content_generator_loaded = False
+
+
+def get_content_generator_class():
+    """
+    The enhanced ``AdvancedContentGenerator`` class, or None if it cannot be imported.
+
+    Imported on first use: enhanced_openai_utils pulls in the Vertex AI SDK,
+    which is the slowest import behind the backend's startup.
+    """
+    global _content_generator_class, _content_generator_loaded
+    if not _content_generator_loaded:
+        try:
+            from .enhanced_openai_utils import AdvancedContentGenerator
+        except ImportError:
+            try:
+                from enhanced_openai_utils import AdvancedContentGenerator
+            except ImportError:
+                print("Warning: enhanced_openai_utils not available, using fallback generation")
+                AdvancedContentGenerator = None
+        _content_generator_class = AdvancedContentGenerator
+        _content_generator_loaded = True
+    return _content_generator_class
+
+# Whisper consumes 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+
+# Videos processed at the same time; each job gets its own scratch directory
+MAX_CONCURRENT_JOBS = int(os.getenv("MODEL_PROCESSOR_CONCURRENCY", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
 
 class ModelProcessor:
     def __init__(self):
-        # Initialize models
-        self.whisper_model = whisper.load_model("base")
-        self.summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+        # Models come from the shared registry and load on first use
         
         # Create necessary directories
         self.temp_dir = Path("temp")
         self.temp_dir.mkdir(exist_ok=True)
 
-    async def process_video(self, video_bytes: bytes) -> tuple[str, str, bytes, list, list, str]:
+        # Whisper installs kv-cache hooks on the shared model while decoding, so
+        # transcriptions must not overlap; the other stages can run concurrently
+        self._whisper_lock = threading.Lock()
+        # Long recordings are split into windows and transcribed on a process pool
+        self.whisper_engine = WhisperEngine()
+        # Created in the first job, on the event loop that serves requests; the
+        # processor itself is built at import time, before any loop is running
+        self._job_slots = None
+
+    @property
+    def whisper_model(self):
+        return get_model("whisper")
+
+    @property
+    def summarizer(self):
+        return get_model("summarizer")
+
+    @staticmethod
+    def versions() -> dict:
+        """Versions of every model behind ``process_video_file``; part of the processing cache key."""
+        enhanced = bool(os.getenv("OPENAI_API_KEY")) and get_content_generator_class() is not None
+        return {
+            "whisper": WHISPER_MODEL_NAME,
+            "summarizer": SUMMARIZER_MODEL_NAME,
+            "quantization": MODEL_QUANTIZATION,
+            "content": "enhanced" if enhanced else "fallback",
+            "tts": "gtts",
+        }
+
+    def _create_workspace(self) -> Path:
+        """Create a private scratch directory for one job."""
+        return Path(tempfile.mkdtemp(prefix="job_", dir=self.temp_dir))
+
+    @staticmethod
+    def _extract_audio(video_path) -> np.ndarray:
+        """
+        Decode the audio track straight to 16 kHz mono float32 samples.
+
+        A single ffmpeg process skips the video stream and resamples to what
+        Whisper expects, so no intermediate WAV or second resample is needed.
         """
-        Process a video file and return transcript, summary, and audio summary.
+        process = subprocess.run(
+            ["ffmpeg", "-nostdin", "-v", "error", "-threads", "0", "-i", str(video_path),
+             "-vn", "-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE), "-f", "f32le", "-acodec", "pcm_f32le", "-"],
+            capture_output=True
+        )
+        if process.returncode != 0:
+            raise RuntimeError(f"Failed to extract audio: {process.stderr.decode(errors='ignore')}")
+        return np.frombuffer(process.stdout, dtype=np.float32)
+
+    def _transcribe(self, audio: np.ndarray) -> str:
+        if self.whisper_engine.should_parallelize(audio):
+            return self.whisper_engine.transcribe(audio)["text"]
+        with self._whisper_lock:
+            return self.whisper_model.transcribe(audio)["text"]
+
+    async def process_video(self, video_bytes: bytes) -> tuple[str, str, bytes, list, list, str, str]:
+        """
+        Process a video held in memory. Prefer ``process_video_file``, which
+        does not need the whole video in memory.
         
         Args:
             video_bytes: The video file as bytes
             
         Returns:
-            tuple: (transcript, summary, audio_bytes, flashcards, quizzes, notes)
+            tuple: (transcript, summary, audio_bytes, flashcards, quizzes, notes, content),
+            see ``process_video_file``
         """
-        # Save video to temp file
-        temp_video_path = self.temp_dir / "temp_video.mp4"
-        with open(temp_video_path, "wb") as f:
-            f.write(video_bytes)
-            
+        workspace = self._create_workspace()
         try:
-            # Extract audio
-            video = VideoFileClip(str(temp_video_path))
-            audio_path = self.temp_dir / "temp_audio.wav"
-            video.audio.write_audiofile(str(audio_path))
-            video.close()
+            temp_video_path = workspace / "video.mp4"
+            with open(temp_video_path, "wb") as f:
+                f.write(video_bytes)
+            return await self.process_video_file(temp_video_path)
+        finally:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    async def process_video_file(self, video_path) -> tuple[str, str, bytes, list, list, str, str]:
+        """
+        Process a video file on disk and return transcript, summary, and audio summary.
+        
+        The file is read in place and left for the caller to delete; no
+        intermediate files are written. Safe to call concurrently: at most
+        ``MAX_CONCURRENT_JOBS`` run at once, and the blocking stages run in worker
+        threads so the event loop stays responsive.
+        
+        Args:
+            video_path: Path to the video file
+            
+        Returns:
+            tuple: (transcript, summary, audio_bytes, flashcards, quizzes, notes, content),
+            where ``content`` names the generator that actually produced the
+            flashcards and quizzes (``"enhanced"`` or ``"fallback"``)
+        """
+        if self._job_slots is None:
+            self._job_slots = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
+        async with self._job_slots:
+            # Extract audio into memory (16 kHz mono float32, as Whisper consumes it)
+            audio = await asyncio.to_thread(self._extract_audio, video_path)
             
             # Transcribe
-            result = self.whisper_model.transcribe(str(audio_path))
-            transcript = result["text"]
+            transcript = await asyncio.to_thread(self._transcribe, audio)
+            del audio
             
             # Summarize using local model
-            summary = summarize_text(transcript)
+            summary = await asyncio.to_thread(summarize_text, transcript)
             
             # Generate enhanced flashcards and quizzes from summary
-            flashcards, quizzes = generate_enhanced_content_from_summary(summary)
+            flashcards, quizzes, content = await asyncio.to_thread(generate_enhanced_content_from_summary, summary)
             
-            # Convert summary to speech
-            audio_io = io.BytesIO()
-            tts = gTTS(summary)
-            tts.write_to_fp(audio_io)
-            audio_io.seek(0)
+            # Convert summary to speech (sentences come from the shared TTS cache)
+            audio_bytes = await asyncio.to_thread(lambda: pcm_to_mp3(synthesize_text(summary)))
             
             notes = "These are your notes."
             
-            return transcript, summary, audio_io.getvalue(), flashcards, quizzes, notes
-            
-        finally:
-            # Cleanup
-            if temp_video_path.exists():
-                temp_video_path.unlink()
-            if audio_path.exists():
-                audio_path.unlink()
+            return transcript, summary, audio_bytes, flashcards, quizzes, notes, content
 
 def generate_enhanced_content_from_summary(summary: str):
-    """Generate sophisticated flashcards and quizzes using the enhanced AI system."""
+    """
+    Generate sophisticated flashcards and quizzes using the enhanced AI system.
+
+    Returns:
+        tuple: (flashcards, quizzes, generator) where ``generator`` is
+        ``"enhanced"``, or ``"fallback"`` when the template generator was used.
+    """
     try:
         # Get API key from environment
         openai_api_key = os.getenv("OPENAI_API_KEY")
+        AdvancedContentGenerator = get_content_generator_class()
         if not openai_api_key or AdvancedContentGenerator is None:
             print("Warning: Enhanced generation not available, using improved fallback")
-            return generate_fallback_content(summary)
+            return (*generate_fallback_content(summary), "fallback")
         
         # Use the enhanced content generator
         generator = AdvancedContentGenerator(openai_api_key)
@@ -103,12 +204,12 @@ def generate_enhanced_content_from_summary(summary: str):
             num_flashcards=3
         )
         
-        return result['flashcards'], result['questions']
+        return result['flashcards'], result['questions'], "enhanced"
         
     except Exception as e:
         print(f"Error in enhanced content generation: {e}")
         print("Falling back to improved generation...")
-        return generate_fallback_content(summary)
+        return (*generate_fallback_content(summary), "fallback")
 
 def generate_fallback_content(summary: str):
     """Fallback content generation if enhanced system fails."""
@@ -0,0 +1,170 @@
+"""
+Persistent cache of processed videos.
+
+Processing a lecture (download, Whisper, BART, flashcards, quizzes and the
+spoken summary) takes minutes, while the result only depends on the source
+media and the models that produced it. Entries are keyed by the YouTube id or
+the sha256 of the uploaded file together with the pipeline's model versions,
+so changing a model invalidates old results automatically. Each entry is a JSON
+file with the text outputs plus an MP3 of the spoken summary, written
+atomically; concurrent requests for the same key share one processing run, and
+the least recently used entries are evicted once the cache exceeds its budget.
+"""
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+PROCESSING_CACHE_DIR = os.getenv(
+    "PROCESSING_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "processing")
+)
+PROCESSING_CACHE_MAX_BYTES = int(os.getenv("PROCESSING_CACHE_MAX_MB", "1024")) * 1024 * 1024
+# Bump when the processing steps change in a way that should invalidate old results
+PIPELINE_VERSION = 2
+
+RESULT_FIELDS = ("transcript", "summary", "audio_bytes", "flashcards", "quizzes", "notes", "content")
+
+
+class ProcessingCache:
+    """Size-bounded LRU cache of ``process_video_file`` results with single-flight processing."""
+
+    def __init__(self, cache_dir=PROCESSING_CACHE_DIR, max_bytes=PROCESSING_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> asyncio.Future shared by concurrent identical requests
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(source, source_id, versions):
+        """
+        Hash of the media identity and the versions of everything that processed it.
+
+        Args:
+            source (str): ``"youtube"`` for a YouTube id, ``"sha256"`` for file content.
+            source_id (str): The YouTube id or the hex sha256 of the media file.
+            versions (dict): Model and pipeline versions, see ``ModelProcessor.versions``.
+        """
+        payload = json.dumps({
+            "source": source,
+            "id": source_id,
+            "versions": versions,
+            "pipeline": PIPELINE_VERSION,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _write_atomic(self, path, data):
+        fd, staging_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(staging_path, path)
+
+    def get(self, key):
+        """Return the cached result tuple for ``key`` or None."""
+        json_path, audio_path = self._paths(key)
+        try:
+            with open(json_path) as f:
+                entry = json.load(f)
+            with open(audio_path, "rb") as f:
+                audio_bytes = f.read()
+            os.utime(json_path)  # mark as most recently used
+        except (FileNotFoundError, ValueError):
+            return None
+        entry["audio_bytes"] = audio_bytes
+        return tuple(entry[field] for field in RESULT_FIELDS)
+
+    def put(self, key, result):
+        """Store a ``(transcript, summary, audio_bytes, flashcards, quizzes, notes, content)`` tuple."""
+        entry = dict(zip(RESULT_FIELDS, result))
+        audio_bytes = entry.pop("audio_bytes") or b""
+        json_path, audio_path = self._paths(key)
+        # Audio first: an entry only counts as present once its JSON exists
+        self._write_atomic(audio_path, audio_bytes)
+        self._write_atomic(json_path, json.dumps(entry).encode("utf-8"))
+        self._evict(keep=key)
+
+    async def get_or_process(self, key, process, should_cache=lambda result: True):
+        """
+        Return the cached result for ``key`` or await ``process()`` exactly once.
+
+        Requests for a key that is already being processed wait for that run
+        instead of starting their own; they count as a cache hit only if its
+        result was stored. Cache reads and writes run in a worker thread so the
+        event loop is not blocked on disk.
+
+        Args:
+            key (str): Cache key from ``key_for``.
+            process (callable): Coroutine function producing the result tuple.
+            should_cache (callable): Decides whether a result may be stored
+                (placeholder results from failed AI calls must not be).
+
+        Returns:
+            tuple: (result, cache_hit)
+        """
+        cached = await asyncio.to_thread(self.get, key)
+        if cached is not None:
+            return cached, True
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            logger.info(f"Waiting for in-flight processing of {key[:12]}")
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await process()
+            stored = should_cache(result)
+            if stored:
+                await asyncio.to_thread(self.put, key, result)
+            future.set_result((result, stored))
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here, so an unawaited future does not log a warning
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    def _evict(self, keep=None):
+        with self._lock:
+            entries = {}
+            for name in os.listdir(self.cache_dir):
+                key, extension = os.path.splitext(name)
+                if extension not in (".json", ".mp3") or key == keep:
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                mtime, size = entries.get(key, (0, 0))
+                # Recency comes from the JSON file, which get() touches
+                entries[key] = (stat.st_mtime if extension == ".json" else mtime, size + stat.st_size)
+
+            total_bytes = sum(size for _, size in entries.values())
+            if keep:
+                total_bytes += sum(os.path.getsize(path) for path in self._paths(keep) if os.path.exists(path))
+
+            for key, (_, size) in sorted(entries.items(), key=lambda item: item[1][0]):
+                if total_bytes <= self.max_bytes:
+                    break
+                for path in self._paths(key):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total_bytes -= size
+                logger.info(f"Evicted processed video {key[:12]}")
+
+
+processing_cache = ProcessingCache()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of the backend
+
+Imports a module in a fresh interpreter with ``python -X importtime`` and reports
+the slowest imports by cumulative time, so cold-start regressions show up in
+review. Run from the project root:
+
+    python backend/profile_imports.py                       # profile backend.main
+    python backend/profile_imports.py --output profile.json  # save a baseline
+    python backend/profile_imports.py --baseline profile.json --fail-over 20
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$")
+
+
+def profile_module(module):
+    """Import ``module`` with -X importtime and return per-import timings in ms."""
+    env = dict(os.environ, WARMUP_MODE="lazy", PYTHONDONTWRITEBYTECODE="1")
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, env=env
+    )
+    imports = []
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append({
+                "module": name.strip(),
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": len(indent) // 2,
+            })
+    if process.returncode != 0:
+        errors = [line for line in process.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(errors[-20:]))
+    total_ms = next((entry["cumulative_ms"] for entry in reversed(imports) if entry["module"] == module), None)
+    return {"module": module, "total_ms": total_ms, "imports": imports}
+
+
+def top_level_packages(profile):
+    """Cumulative time of each top-level package at the first place it was imported."""
+    packages = {}
+    for entry in profile["imports"]:
+        package = entry["module"].split(".")[0]
+        packages[package] = max(packages.get(package, 0), entry["cumulative_ms"])
+    return packages
+
+
+def print_report(profile, top):
+    print(f"Import of {profile['module']}: {profile['total_ms']:.0f} ms")
+    print(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+    slowest = sorted(profile["imports"], key=lambda entry: entry["cumulative_ms"], reverse=True)[:top]
+    for entry in slowest:
+        print(f"{entry['cumulative_ms']:>14.1f}{entry['self_ms']:>10.1f}  {entry['module']}")
+
+
+def compare(profile, baseline, fail_over_percent):
+    """Print packages that got slower than the baseline; return True on a regression."""
+    current, previous = top_level_packages(profile), top_level_packages(baseline)
+    print(f"\nTotal: {baseline['total_ms']:.0f} ms -> {profile['total_ms']:.0f} ms")
+    changes = sorted(current, key=lambda name: previous.get(name, 0) - current[name])
+    for name in changes[:10]:
+        growth = current[name] - previous.get(name, 0)
+        if growth < 5:
+            break
+        label = "new import" if name not in previous else f"was {previous[name]:.1f} ms"
+        print(f"  + {name}: {current[name]:.1f} ms ({label})")
+    regressed = profile["total_ms"] > baseline["total_ms"] * (1 + fail_over_percent / 100)
+    if regressed:
+        print(f"REGRESSION: import time grew by more than {fail_over_percent}%")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile backend import time")
+    parser.add_argument("--module", default="backend.main", help="Module to import")
+    parser.add_argument("--top", type=int, default=25, help="Number of slowest imports to list")
+    parser.add_argument("--output", help="Write the profile as JSON (use as a baseline later)")
+    parser.add_argument("--baseline", help="Compare against a saved profile")
+    parser.add_argument("--fail-over", type=float, default=20.0,
+                        help="Exit non-zero if total import time grew by more than this percent")
+    args = parser.parse_args(argv)
+
+    profile = profile_module(args.module)
+    print_report(profile, args.top)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(profile, f, indent=2)
+        print(f"\nProfile written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(profile, baseline, args.fail_over):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+fp32 vs int8 accuracy/latency report for Whisper and BART
+
+Runs the fixed transcript set below through the summarizer and Whisper once per
+``MODEL_QUANTIZATION`` mode, each mode in a fresh interpreter so load time and
+memory are measured in isolation, and reports:
+
+- summarizer latency per transcript and unigram F1 of the int8 summary against
+  the fp32 summary of the same transcript
+- Whisper latency, real-time factor and word error rate against the reference
+  transcript
+- model load time, weight size and process RSS
+
+Whisper input is the transcript spoken through the shared TTS sentence cache
+(gTTS on the first run, cached afterwards); pass ``--audio-dir`` with
+``name.wav``/``name.txt`` pairs to use real recordings instead. Run from the
+project root:
+
+    python backend/quantization_report.py --repeats 3 --output quantization.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+from collections import Counter
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("none", "int8")
+
+# Fixed transcript set so runs are comparable across commits and machines
+TRANSCRIPTS = {
+    "photosynthesis": (
+        "Today we are looking at photosynthesis, the process plants use to turn light into food. "
+        "It happens in the chloroplasts, which contain a green pigment called chlorophyll. "
+        "In the light dependent reactions, chlorophyll absorbs light and uses that energy to split water "
+        "molecules, releasing oxygen as a by-product. The energy is stored in two carrier molecules, ATP "
+        "and NADPH. In the Calvin cycle, the plant uses ATP and NADPH to fix carbon dioxide from the air "
+        "into a three carbon sugar, which is later built up into glucose. The rate of photosynthesis "
+        "depends on light intensity, carbon dioxide concentration and temperature, and whichever of these "
+        "is in shortest supply limits the whole process."
+    ),
+    "french_revolution": (
+        "The French Revolution began in 1789 when a financial crisis forced King Louis the Sixteenth to call "
+        "the Estates General for the first time in over a century. The Third Estate, representing ordinary "
+        "people, declared itself the National Assembly and swore not to disband until France had a "
+        "constitution. Weeks later crowds stormed the Bastille. The Assembly abolished feudal privileges and "
+        "published the Declaration of the Rights of Man and of the Citizen. By 1792 France was at war with "
+        "Austria and Prussia, the monarchy had been abolished and the king was executed the following year. "
+        "The period known as the Terror saw thousands executed before Napoleon Bonaparte seized power in 1799."
+    ),
+    "newton": (
+        "Newton's three laws of motion describe how forces change the way objects move. The first law says "
+        "an object stays at rest or keeps moving at a constant velocity unless a net force acts on it, which "
+        "is why passengers lurch forward when a bus brakes suddenly. The second law says the acceleration of "
+        "an object equals the net force divided by its mass, so the same push moves a bicycle much faster "
+        "than a car. The third law says that every action has an equal and opposite reaction. A rocket "
+        "pushes exhaust gas backwards and the gas pushes the rocket forwards, which is how it can accelerate "
+        "in the vacuum of space where there is nothing to push against."
+    ),
+    "supply_demand": (
+        "In a competitive market, prices are set by supply and demand. The demand curve slopes downwards "
+        "because buyers purchase more of a good when it is cheaper. The supply curve slopes upwards because "
+        "producers are willing to sell more when the price is higher. The market settles at the equilibrium "
+        "price where the quantity demanded equals the quantity supplied. If demand rises while supply stays "
+        "the same, there is a shortage at the old price and the price climbs until the market clears again. "
+        "Governments sometimes set price ceilings, such as rent controls, which keep prices below equilibrium "
+        "and cause shortages, or price floors, such as minimum wages, which can create surpluses."
+    ),
+    "dna": (
+        "DNA stores genetic information as a sequence of four bases, adenine, thymine, guanine and cytosine. "
+        "The two strands of the double helix are held together by pairs of bases, adenine with thymine and "
+        "guanine with cytosine. When a gene is expressed, the enzyme RNA polymerase copies its sequence into "
+        "messenger RNA in a process called transcription. Ribosomes then read the messenger RNA three bases "
+        "at a time and join the matching amino acids into a protein, which is called translation. A mutation "
+        "changes the DNA sequence. Most mutations have no effect, some cause disease, and a few give an "
+        "advantage that natural selection can spread through a population over many generations."
+    ),
+}
+
+
+def normalize_words(text):
+    return re.findall(r"[a-z0-9']+", (text or "").lower())
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(len(ref), 1)
+
+
+def unigram_f1(reference, candidate):
+    """Bag-of-words F1 (ROUGE-1) of ``candidate`` against ``reference``."""
+    ref, cand = Counter(normalize_words(reference)), Counter(normalize_words(candidate))
+    overlap = sum((ref & cand).values())
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / sum(cand.values()), overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def load_audio_set(audio_dir):
+    """Return {name: (float32 samples at 16 kHz, reference transcript)}."""
+    import numpy as np
+    if audio_dir:
+        import whisper
+        audio_set = {}
+        for file_name in sorted(os.listdir(audio_dir)):
+            name, extension = os.path.splitext(file_name)
+            reference_path = os.path.join(audio_dir, f"{name}.txt")
+            if extension.lower() == ".wav" and os.path.exists(reference_path):
+                with open(reference_path) as f:
+                    audio_set[name] = (whisper.load_audio(os.path.join(audio_dir, file_name)), f.read())
+        return audio_set
+    from model.src.app.audio_cache import synthesize_text
+    return {
+        name: (np.frombuffer(synthesize_text(text), dtype=np.int16).astype(np.float32) / 32768.0, text)
+        for name, text in TRANSCRIPTS.items()
+    }
+
+
+def timed(function, repeats):
+    """Call ``function`` once to warm up, then ``repeats`` times; return (result, median seconds)."""
+    result = function()
+    durations = []
+    for _ in range(max(1, repeats)):
+        start_time = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start_time)
+    return result, median(durations)
+
+
+def run_mode(args):
+    """Measure the current interpreter's MODEL_QUANTIZATION mode (runs in a child process)."""
+    sys.path.insert(0, PROJECT_ROOT)
+    import psutil
+    from model.src.app.model_registry import registry, MODEL_QUANTIZATION
+    from model.src.app.summarizer import summarize_text
+
+    report = {"mode": MODEL_QUANTIZATION, "summarizer": {}, "whisper": {}}
+
+    if not args.skip_summarizer:
+        registry.get("summarizer")
+        for name, text in TRANSCRIPTS.items():
+            summary, seconds = timed(lambda: summarize_text(text), args.repeats)
+            report["summarizer"][name] = {"seconds": round(seconds, 3), "summary": summary}
+            print(f"[{MODEL_QUANTIZATION}] summarizer {name}: {seconds:.2f}s", file=sys.stderr)
+
+    if not args.skip_whisper:
+        try:
+            audio_set = load_audio_set(args.audio_dir)
+        except Exception as e:
+            report["whisper_error"] = f"No audio for Whisper: {e}"
+            audio_set = {}
+        if audio_set:
+            model = registry.get("whisper")
+        for name, (audio, reference) in audio_set.items():
+            result, seconds = timed(lambda: model.transcribe(audio, fp16=False, language="en"), args.repeats)
+            audio_seconds = len(audio) / 16000
+            report["whisper"][name] = {
+                "seconds": round(seconds, 3),
+                "real_time_factor": round(seconds / audio_seconds, 3),
+                "wer": round(word_error_rate(reference, result["text"]), 4),
+                "text": result["text"].strip(),
+            }
+            print(f"[{MODEL_QUANTIZATION}] whisper {name}: {seconds:.2f}s", file=sys.stderr)
+
+    report["models"] = registry.status()
+    report["rss_mb"] = round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+    return report
+
+
+def spawn_mode(mode, args):
+    command = [sys.executable, os.path.abspath(__file__), "--run-mode", "--repeats", str(args.repeats)]
+    if args.audio_dir:
+        command += ["--audio-dir", os.path.abspath(args.audio_dir)]
+    if args.skip_whisper:
+        command.append("--skip-whisper")
+    if args.skip_summarizer:
+        command.append("--skip-summarizer")
+    env = dict(os.environ, MODEL_QUANTIZATION=mode, WARMUP_MODE="lazy")
+    process = subprocess.run(command, cwd=PROJECT_ROOT, env=env, stdout=subprocess.PIPE, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Measuring mode {mode} failed with exit code {process.returncode}")
+    return json.loads(process.stdout)
+
+
+def compare(reports):
+    """Per-transcript comparison of the int8 run against the fp32 run."""
+    baseline, quantized = reports["none"], reports["int8"]
+    comparison = {"summarizer": {}, "whisper": {}, "models": {}}
+    for name, result in quantized["summarizer"].items():
+        reference = baseline["summarizer"][name]
+        comparison["summarizer"][name] = {
+            "fp32_seconds": reference["seconds"],
+            "int8_seconds": result["seconds"],
+            "speedup": round(reference["seconds"] / result["seconds"], 2),
+            "f1_vs_fp32": round(unigram_f1(reference["summary"], result["summary"]), 4),
+        }
+    for name, result in quantized["whisper"].items():
+        reference = baseline["whisper"][name]
+        comparison["whisper"][name] = {
+            "fp32_seconds": reference["seconds"],
+            "int8_seconds": result["seconds"],
+            "speedup": round(reference["seconds"] / result["seconds"], 2),
+            "fp32_wer": reference["wer"],
+            "int8_wer": result["wer"],
+        }
+    for name in ("whisper", "summarizer"):
+        fp32_model, int8_model = baseline["models"].get(name, {}), quantized["models"].get(name, {})
+        if fp32_model.get("loaded") and int8_model.get("loaded"):
+            comparison["models"][name] = {
+                key: (fp32_model.get(key), int8_model.get(key)) for key in ("load_seconds", "parameter_mb")
+            }
+    comparison["rss_mb"] = (baseline["rss_mb"], quantized["rss_mb"])
+    return comparison
+
+
+def print_report(comparison):
+    if comparison["summarizer"]:
+        print(f"\nSummarizer{'fp32 s':>18}{'int8 s':>10}{'speedup':>10}{'F1 vs fp32':>12}")
+        for name, row in comparison["summarizer"].items():
+            print(f"  {name:<20}{row['fp32_seconds']:>8.2f}{row['int8_seconds']:>10.2f}"
+                  f"{row['speedup']:>9.2f}x{row['f1_vs_fp32']:>12.3f}")
+        rows = comparison["summarizer"].values()
+        print(f"  {'median':<20}{'':>8}{'':>10}{median([r['speedup'] for r in rows]):>9.2f}x"
+              f"{median([r['f1_vs_fp32'] for r in rows]):>12.3f}")
+    if comparison["whisper"]:
+        print(f"\nWhisper{'fp32 s':>21}{'int8 s':>10}{'speedup':>10}{'fp32 WER':>10}{'int8 WER':>10}")
+        for name, row in comparison["whisper"].items():
+            print(f"  {name:<20}{row['fp32_seconds']:>8.2f}{row['int8_seconds']:>10.2f}"
+                  f"{row['speedup']:>9.2f}x{row['fp32_wer']:>10.3f}{row['int8_wer']:>10.3f}")
+    print("\nModels (fp32 -> int8)")
+    for name, stats in comparison["models"].items():
+        print(f"  {name}: load {stats['load_seconds'][0]}s -> {stats['load_seconds'][1]}s, "
+              f"weights {stats['parameter_mb'][0]} MB -> {stats['parameter_mb'][1]} MB")
+    print(f"  RSS after run: {comparison['rss_mb'][0]} MB -> {comparison['rss_mb'][1]} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare fp32 and int8 Whisper/BART on a fixed transcript set")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per transcript (after one warm-up)")
+    parser.add_argument("--audio-dir", help="Directory of name.wav/name.txt pairs for Whisper")
+    parser.add_argument("--skip-whisper", action="store_true")
+    parser.add_argument("--skip-summarizer", action="store_true")
+    parser.add_argument("--output", help="Write both runs and the comparison as JSON")
+    parser.add_argument("--run-mode", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_mode:
+        stdout, sys.stdout = sys.stdout, sys.stderr  # keep model loading chatter out of the JSON
+        json.dump(run_mode(args), stdout)
+        return 0
+
+    reports = {mode: spawn_mode(mode, args) for mode in MODES}
+    for report in reports.values():
+        if "whisper_error" in report:
+            print(report["whisper_error"])
+    comparison = compare(reports)
+    print_report(comparison)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"runs": reports, "comparison": comparison}, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
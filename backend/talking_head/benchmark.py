@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Talking head pipeline benchmark
+
+Drives ``generate_talking_video`` with a fixed corpus of summaries and faces and
+reports p50/p95/p99 latency, jobs per minute and peak RSS (this process plus the
+worker pool and its ffmpeg children) for each performance mode.
+
+By default SadTalker is replaced by the CPU-only ``StubRenderer``, so the
+benchmark runs on machines without checkpoints. Pass ``--renderer sadtalker``
+to measure real renders. Run from the backend directory:
+
+    python -m talking_head.benchmark --modes fast balanced --repeats 3 --concurrency 2
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+
+# Fixed corpus so runs are comparable across commits; lengths span one sentence to a paragraph
+SUMMARIES = [
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "The French Revolution began in 1789. It ended the monarchy and reshaped European politics "
+    "for the following century.",
+    "Newton's three laws describe how forces change motion. An object keeps its velocity unless a "
+    "net force acts on it, force equals mass times acceleration, and every action has an equal and "
+    "opposite reaction.",
+    "Supply and demand set prices in a competitive market. When demand rises and supply stays fixed, "
+    "prices increase until fewer buyers are willing to pay. When supply grows faster than demand, "
+    "prices fall. Governments sometimes intervene with price ceilings or floors, which can cause "
+    "shortages or surpluses.",
+    "DNA stores genetic information as a sequence of four bases. During transcription the sequence is "
+    "copied into messenger RNA, which ribosomes translate into proteins. Mutations change the sequence "
+    "and can alter the resulting protein. Most are harmless, some cause disease, and a few provide an "
+    "advantage that natural selection can spread through a population over many generations.",
+]
+FACES = [
+    os.path.join(ASSETS_DIR, "default_face.jpg"),
+    os.path.join(ASSETS_DIR, "fallback_frame.jpg"),
+]
+
+
+class PeakRSSMonitor:
+    """Samples the RSS of this process and all of its descendants on a background thread."""
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        self.peak_bytes = max(self.peak_bytes, total)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def percentile(values, q):
+    """Linearly interpolated percentile of a non-empty list, ``q`` in [0, 100]."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def run_mode(generate_video, mode, jobs, concurrency):
+    """Render every (text, face) job in ``mode`` and summarize the run."""
+    latencies, fallbacks, errors = [], 0, []
+
+    def run_one(job):
+        text, face = job
+        start = time.perf_counter()
+        video_path = generate_video.generate_talking_video(text, face, mode)
+        return time.perf_counter() - start, generate_video.is_fallback_video(video_path)
+
+    with PeakRSSMonitor() as rss, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        wall_start = time.perf_counter()
+        futures = [executor.submit(run_one, job) for job in jobs]
+        for future in futures:
+            try:
+                latency, is_fallback = future.result()
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append(latency)
+            fallbacks += int(is_fallback)
+        wall_time = time.perf_counter() - wall_start
+
+    result = {
+        "mode": mode,
+        "jobs": len(jobs),
+        "completed": len(latencies),
+        "fallbacks": fallbacks,
+        "errors": errors,
+        "wall_time_s": round(wall_time, 2),
+        "jobs_per_minute": round(len(latencies) / wall_time * 60, 2) if wall_time else 0.0,
+        "peak_rss_mb": round(rss.peak_bytes / (1024 * 1024), 1),
+    }
+    if latencies:
+        result.update({
+            "p50_s": round(percentile(latencies, 50), 3),
+            "p95_s": round(percentile(latencies, 95), 3),
+            "p99_s": round(percentile(latencies, 99), 3),
+            "mean_s": round(sum(latencies) / len(latencies), 3),
+        })
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the talking head pipeline")
+    parser.add_argument("--modes", nargs="+", default=["fast", "balanced", "quality"],
+                        help="Performance modes to benchmark")
+    parser.add_argument("--repeats", type=int, default=2, help="Passes over the summary/face corpus per mode")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Concurrent requests (default: SADTALKER_POOL_SIZE)")
+    parser.add_argument("--renderer", choices=["stub", "sadtalker"], default="stub",
+                        help="Render with the CPU-only stub or real SadTalker")
+    parser.add_argument("--tts", choices=["piper", "gtts", "mock"], default=None,
+                        help="TTS backend (default: the configured chain; 'mock' avoids network jitter)")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="Keep the result cache on (repeats then measure cache hits)")
+    parser.add_argument("--allow-downgrade", action="store_true",
+                        help="Let admission control downgrade modes (mixes modes in the results)")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # generate_video reads its configuration at import time
+    os.environ["SADTALKER_RENDERER"] = args.renderer
+    os.environ["SADTALKER_USE_WORKER_POOL"] = "1"
+    if args.tts:
+        os.environ["TTS_BACKEND"] = args.tts
+    os.environ["TALKING_HEAD_RESULT_CACHE"] = "1" if args.use_cache else "0"
+    os.environ["TALKING_HEAD_AUTO_DOWNGRADE"] = "1" if args.allow_downgrade else "0"
+    from . import generate_video
+    from .worker_pool import get_worker_pool, shutdown_worker_pool
+
+    unknown = [mode for mode in args.modes if mode not in generate_video.PERFORMANCE_CONFIGS]
+    if unknown:
+        print(f"Unknown performance modes: {', '.join(unknown)}")
+        return 2
+
+    concurrency = args.concurrency or generate_video.SADTALKER_POOL_SIZE
+    jobs = [(text, face) for _ in range(args.repeats) for text in SUMMARIES for face in FACES]
+
+    print(f"Starting {generate_video.SADTALKER_POOL_SIZE} {args.renderer} worker(s)...")
+    # Same warm-up as generate_video, so no job loads models inside the timed window
+    pool = get_worker_pool(generate_video.SADTALKER_POOL_SIZE, generate_video.SADTALKER_ROOT_DIR,
+                           renderer_factory=generate_video.get_renderer_factory(),
+                           warm_up_options=generate_video.worker_warm_up_options())
+    if not pool.wait_until_ready():
+        print("Worker pool failed to start")
+        return 1
+
+    results = []
+    try:
+        for mode in args.modes:
+            print(f"Benchmarking '{mode}': {len(jobs)} jobs, concurrency {concurrency}")
+            results.append(run_mode(generate_video, mode, jobs, concurrency))
+    finally:
+        shutdown_worker_pool()
+
+    print("\n" + "=" * 78)
+    print(f"{'mode':<10}{'done':>6}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'jobs/min':>10}{'peak RSS MB':>13}{'fallback':>10}")
+    print("=" * 78)
+    for result in results:
+        print(f"{result['mode']:<10}{result['completed']:>6}{result.get('p50_s', 0):>9.2f}"
+              f"{result.get('p95_s', 0):>9.2f}{result.get('p99_s', 0):>9.2f}{result['jobs_per_minute']:>10.2f}"
+              f"{result['peak_rss_mb']:>13.1f}{result['fallbacks']:>10}")
+        for error in result["errors"][:3]:
+            print(f"  ! {error}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"renderer": args.renderer, "concurrency": concurrency, "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
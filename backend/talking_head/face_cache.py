@@ -0,0 +1,126 @@
+"""
+Content-addressed cache for SadTalker source-face preprocessing.
+
+``CropAndExtract.generate`` runs face detection, cropping and 3DMM fitting on the
+source image for every job, although the app mostly renders the default face or
+a handful of uploaded ones. Entries are keyed by the sha256 of the image bytes
+plus the preprocess mode and size, and hold the first-frame coefficients, the
+cropped image and ``crop_info``. The least recently used entries are evicted
+once the cache grows past its entry or byte limit.
+"""
+import os
+import shutil
+import pickle
+import hashlib
+import logging
+import tempfile
+import threading
+
+from .utils import sha256_file
+
+logger = logging.getLogger(__name__)
+
+COEFF_FILE = "first_coeff.mat"
+CROP_INFO_FILE = "crop_info.pkl"
+
+
+class SourceFaceCache:
+    """Disk-backed LRU cache of source-face 3DMM extraction results."""
+
+    def __init__(self, cache_dir, max_entries=64, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(image_path, preprocess, size):
+        """Cache key: image content hash plus the options that change the crop."""
+        return hashlib.sha256(f"{sha256_file(image_path)}:{preprocess}:{size}".encode()).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key, work_dir):
+        """
+        Copy a cached entry into ``work_dir`` and return its outputs.
+
+        Files are copied rather than referenced so a concurrent eviction cannot
+        remove them while a render is still reading them.
+
+        Returns:
+            tuple: (first_coeff_path, crop_pic_path, crop_info), or None on a miss.
+        """
+        entry_dir = self._entry_dir(key)
+        try:
+            crop_name = next(name for name in os.listdir(entry_dir) if name.startswith("crop."))
+            with open(os.path.join(entry_dir, CROP_INFO_FILE), "rb") as f:
+                crop_info = pickle.load(f)
+            os.makedirs(work_dir, exist_ok=True)
+            first_coeff_path = shutil.copy(os.path.join(entry_dir, COEFF_FILE), work_dir)
+            crop_pic_path = shutil.copy(os.path.join(entry_dir, crop_name), work_dir)
+            os.utime(entry_dir)  # mark as most recently used
+        except (FileNotFoundError, StopIteration):
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable face cache entry {key}: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+        return first_coeff_path, crop_pic_path, crop_info
+
+    def put(self, key, first_coeff_path, crop_pic_path, crop_info):
+        """Store extraction outputs under ``key`` and evict old entries if needed."""
+        staging_dir = tempfile.mkdtemp(prefix=".staging_", dir=self.cache_dir)
+        try:
+            shutil.copy(first_coeff_path, os.path.join(staging_dir, COEFF_FILE))
+            crop_ext = os.path.splitext(crop_pic_path)[1] or ".png"
+            shutil.copy(crop_pic_path, os.path.join(staging_dir, f"crop{crop_ext}"))
+            with open(os.path.join(staging_dir, CROP_INFO_FILE), "wb") as f:
+                pickle.dump(crop_info, f)
+            # Atomic publish; another worker may have stored the same face meanwhile
+            os.replace(staging_dir, self._entry_dir(key))
+        except OSError:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        self._evict()
+
+    def get_or_extract(self, preprocess_model, pic_path, work_dir, preprocess, size):
+        """
+        Return cached extraction outputs for ``pic_path`` or run ``preprocess_model``.
+
+        Returns:
+            tuple: (first_coeff_path, crop_pic_path, crop_info)
+        """
+        key = self.key_for(pic_path, preprocess, size)
+        cached = self.get(key, work_dir)
+        if cached is not None:
+            logger.info(f"Face cache hit for {os.path.basename(pic_path)} ({preprocess}, {size})")
+            return cached
+
+        first_coeff_path, crop_pic_path, crop_info = preprocess_model.generate(
+            pic_path, work_dir, preprocess, source_image_flag=True, pic_size=size
+        )[:3]
+        if first_coeff_path is not None and crop_pic_path is not None:
+            self.put(key, first_coeff_path, crop_pic_path, crop_info)
+        return first_coeff_path, crop_pic_path, crop_info
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                path = self._entry_dir(name)
+                if name.startswith(".") or not os.path.isdir(path):
+                    continue
+                try:
+                    size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                    entries.append((os.path.getmtime(path), size, path))
+                except FileNotFoundError:
+                    continue  # removed by another worker meanwhile
+
+            entries.sort()
+            total_bytes = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+                _, size, path = entries.pop(0)
+                shutil.rmtree(path, ignore_errors=True)
+                total_bytes -= size
+                logger.info(f"Evicted face cache entry {os.path.basename(path)}")
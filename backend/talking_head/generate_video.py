@@ -4,9 +4,13 @@ import uuid
 import logging
 import shutil
 import time
-import psutil
 import json
-from .tts import text_to_speech_mock # Use relative import within the package
+import threading
+from .tts import text_to_speech_real, tts_identity # Use relative import within the package
+from .worker_pool import get_worker_pool, SadTalkerRenderer
+from .result_cache import VideoResultCache
+from .resources import ResourceSampler, AdmissionController, ResourcesExhaustedError
+from .metrics import record_stage, log_event, function_seconds, requests_total
 from pathlib import Path
 
 # Configure logging
@@ -16,12 +20,13 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 def profile_execution_time(func):
     """Decorator to profile function execution time"""
     def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        execution_time = end_time - start_time
-        logging.info(f"⏱️ {func.__name__} execution time: {execution_time:.2f} seconds")
-        return result
+        start_time = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            execution_time = time.perf_counter() - start_time
+            function_seconds.observe(execution_time, function=func.__name__)
+            logging.info(f"⏱️ {func.__name__} execution time: {execution_time:.2f} seconds")
     return wrapper
 
 def check_gpu_availability():
@@ -42,11 +47,11 @@ def check_gpu_availability():
         return False, "Unknown"
 
 def monitor_system_resources():
-    """Monitor system resources during processing"""
-    cpu_percent = psutil.cpu_percent(interval=1)
-    memory = psutil.virtual_memory()
-    memory_percent = memory.percent
-    available_memory = memory.available / (1024**3)  # GB
+    """Report system resources from the background sampler (never blocks)"""
+    snapshot = resource_sampler.latest()
+    cpu_percent = snapshot['cpu_percent']
+    memory_percent = snapshot['memory_percent']
+    available_memory = snapshot['available_memory_gb']
     
     logging.info(f"🖥️ System Resources - CPU: {cpu_percent}%, Memory: {memory_percent}% ({available_memory:.1f}GB available)")
     return {
@@ -109,7 +114,31 @@ WINDOWS_SADTALKER_PATH = ENHANCED_SADTALKER_PATH
 # Path to our batch file that properly activates the SadTalker environment
 SADTALKER_BATCH_FILE = "D:\\University files\\Graduation Project\\Website\\run_sadtalker_enhanced.bat"
 
+# Persistent worker pool: keeps SadTalker models loaded between requests instead of
+# spawning a new inference process (and reloading every checkpoint) per video
+USE_WORKER_POOL = os.getenv("SADTALKER_USE_WORKER_POOL", "1") == "1"
+SADTALKER_POOL_SIZE = int(os.getenv("SADTALKER_POOL_SIZE", "1"))
+# "stub" renders with the CPU-only StubRenderer (no checkpoints needed), for benchmarks
+SADTALKER_RENDERER = os.getenv("SADTALKER_RENDERER", "sadtalker")
+
+# Cache of source-face crops and 3DMM coefficients, keyed by image content hash
+FACE_CACHE_DIR = os.path.join(BASE_DIR, "cache", "faces")
+
+# Cache of finished videos keyed by (text, face, config); served from /media/cache
+USE_RESULT_CACHE = os.getenv("TALKING_HEAD_RESULT_CACHE", "1") == "1"
+RESULT_CACHE_DIR = os.path.join(MEDIA_DIR, "cache")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("TALKING_HEAD_CACHE_MAX_MB", "2048")) * 1024 * 1024
+
+# Render options used by both the worker pool and the subprocess fallback
+SADTALKER_RENDER_OPTIONS = {
+    "preprocess": "resize",  # Use resize instead of crop for faster processing
+    "still": True,  # Prevents expression changes
+    "size": 256,  # Use 256 size for faster processing
+    "enhancer": "gfpgan"  # Use GFPGAN enhancer
+}
+
 # Performance Configuration
+# min_free_memory_gb / cores are what the admission controller reserves per render
 PERFORMANCE_MODE = "balanced"  # Options: "fast", "balanced", "quality"
 PERFORMANCE_CONFIGS = {
     "fast": {
@@ -117,24 +146,41 @@ PERFORMANCE_CONFIGS = {
         "preprocess": "crop",
         "enhancer": "none",
         "size": 256,
-        "expression_scale": 1.0
+        "expression_scale": 1.0,
+        "min_free_memory_gb": 1.5,
+        "cores": 1
     },
     "balanced": {
         "timeout": 900,  # 15 minutes
         "preprocess": "crop",  # Changed from "full" to "crop" for speed
         "enhancer": "gfpgan",
         "size": 256,
-        "expression_scale": 1.0
+        "expression_scale": 1.0,
+        "min_free_memory_gb": 2.5,
+        "cores": 2
     },
     "quality": {
         "timeout": 900,  # 15 minutes
         "preprocess": "full",
         "enhancer": "gfpgan",
         "size": 512,
-        "expression_scale": 1.0
+        "expression_scale": 1.0,
+        "min_free_memory_gb": 5.0,
+        "cores": 4
     }
 }
 
+# Resource-aware admission: renders wait (up to the timeout) for free memory and
+# cores, and are stepped down to a cheaper performance mode under pressure
+resource_sampler = ResourceSampler(interval=2.0)
+admission_controller = AdmissionController(
+    PERFORMANCE_CONFIGS,
+    resource_sampler,
+    max_cpu_percent=int(os.getenv("TALKING_HEAD_MAX_CPU_PERCENT", "90")),
+    auto_downgrade=os.getenv("TALKING_HEAD_AUTO_DOWNGRADE", "1") == "1",
+    admission_timeout=int(os.getenv("TALKING_HEAD_ADMISSION_TIMEOUT", "300"))
+)
+
 # Check if we're in development or production mode to set proper paths
 if os.path.exists("/opt/SadTalker"):
     # Production path (Linux)
@@ -169,15 +215,99 @@ if not os.path.exists(DEFAULT_FACE_IMAGE):
         else:
             logging.warning(f"Default face image not found at {DEFAULT_FACE_IMAGE}. Please add a default face image.")
 
-@profile_execution_time
-def generate_talking_video(text, source_image_path=None, performance_mode=None):
+def get_renderer_factory():
+    """Renderer class the worker pool instantiates in each worker process."""
+    if SADTALKER_RENDERER == "stub":
+        from .stub_renderer import StubRenderer
+        return StubRenderer
+    return SadTalkerRenderer
+
+def sadtalker_subprocess_options(script_path):
     """
-    Generate a talking head video from text input with performance optimization.
+    Extra arguments and environment for a SadTalker inference subprocess.
+
+    The scripts live in the SadTalker checkout, and only versions derived from
+    ``inference_sadtalker.py`` accept ``--face_cache_dir``, so the option is
+    passed to scripts that declare it. ``PYTHONPATH`` lets such a script import
+    the face cache from this backend.
+    """
+    try:
+        with open(script_path, encoding="utf-8", errors="ignore") as f:
+            supports_face_cache = "--face_cache_dir" in f.read()
+    except OSError:
+        supports_face_cache = False
+    if not supports_face_cache:
+        return [], None
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [BASE_DIR, env.get("PYTHONPATH")]))
+    return ["--face_cache_dir", FACE_CACHE_DIR], env
+
+
+def worker_warm_up_options():
+    """Model options (size, preprocess) workers warm up; they match what jobs render with."""
+    return {key: SADTALKER_RENDER_OPTIONS[key] for key in ("size", "preprocess")}
+
+def sadtalker_mode_args(config):
+    """
+    Output size and enhancer flags for the admitted performance mode.
+
+    The subprocess scripts get the same size and enhancer as a worker pool job,
+    so a downgraded admission renders the cheaper mode on either path.
+    """
+    args = ["--size", str(config["size"])]
+    if config["enhancer"] not in (None, "none"):
+        args += ["--enhancer", config["enhancer"]]
+    return args
+
+def run_sadtalker_worker_pool(request_id, audio_path, source_image_path, result_dir, config):
+    """
+    Render a video on the persistent SadTalker worker pool.
+
+    Returns:
+        dict: Renderer result with ``video_path`` and ``timings``, or None when the
+        pool is disabled or could not start (callers then use the subprocess path).
+    """
+    if not USE_WORKER_POOL:
+        return None
+
+    # Warm the models for the options jobs render with, or the first job loads a second set
+    pool = get_worker_pool(SADTALKER_POOL_SIZE, SADTALKER_ROOT_DIR, renderer_factory=get_renderer_factory(),
+                           warm_up_options=worker_warm_up_options())
+    if not pool.wait_until_ready():
+        logging.warning(f"[Request {request_id}] SadTalker worker pool unavailable, using subprocess")
+        return None
+
+    job = dict(SADTALKER_RENDER_OPTIONS)
+    job.update({
+        # The performance mode decides the expensive parts (enhancer, output size)
+        "enhancer": config["enhancer"],
+        "size": config["size"],
+        "driven_audio": audio_path,
+        "source_image": source_image_path,
+        "result_dir": result_dir,
+        "expression_scale": config["expression_scale"],
+        "face_cache_dir": FACE_CACHE_DIR
+    })
+
+    logging.info(f"[Request {request_id}] Rendering on warm SadTalker worker pool ({pool.num_workers} workers)")
+    try:
+        return pool.render(job, timeout=config["timeout"])
+    except TimeoutError as e:
+        logging.error(f"[Request {request_id}] {e}")
+        raise RuntimeError(f"SadTalker worker timed out after {config['timeout']} seconds - try 'fast' performance mode or check dependencies")
+
+def _render_talking_video(text, source_image_path=None, performance_mode=None, progress_callback=None,
+                          synthesis=None):
+    """
+    Render a talking head video from text input, bypassing the result cache.
     
     Args:
         text (str): The text to be spoken by the talking head.
         source_image_path (str, optional): Path to a custom source image. If None, default face is used.
         performance_mode (str, optional): Performance mode - "fast", "balanced", or "quality"
+        progress_callback (callable, optional): Called as ``progress_callback(stage, percent)``
+            as the pipeline advances, e.g. to feed job status events.
+        synthesis (dict, optional): Filled with the TTS backend that voiced the video.
         
     Returns:
         str: Path to the generated video file.
@@ -185,6 +315,10 @@ def generate_talking_video(text, source_image_path=None, performance_mode=None):
     try:
         request_id = str(uuid.uuid4())
         start_time = time.time()
+
+        def report_progress(stage, percent):
+            if progress_callback:
+                progress_callback(stage, percent)
         
         # Use performance mode configuration
         if performance_mode is None:
@@ -201,10 +335,12 @@ def generate_talking_video(text, source_image_path=None, performance_mode=None):
         gpu_available, gpu_info = check_gpu_availability()
         
         # Step 1: Generate audio from text
+        report_progress("tts", 5)
         audio_start_time = time.time()
         logging.info(f"[Request {request_id}] Generating audio...")
-        audio_path = text_to_speech_mock(text, request_id)
+        audio_path = text_to_speech_real(text, request_id=request_id, synthesis=synthesis)
         audio_duration = time.time() - audio_start_time
+        record_stage("tts", audio_duration, request_id)
         logging.info(f"[Request {request_id}] Audio generated in {audio_duration:.2f}s: {audio_path}")
         
         # Step 2: Create result directory
@@ -218,14 +354,17 @@ def generate_talking_video(text, source_image_path=None, performance_mode=None):
                 raise FileNotFoundError(f"Default face image not found at {source_image_path}")
         
         # Step 4: Validate SadTalker setup before running
+        report_progress("validation", 20)
         validation_start_time = time.time()
         logging.info(f"[Request {request_id}] Validating SadTalker setup...")
-        if not validate_sadtalker_setup():
+        if getattr(get_renderer_factory(), "requires_checkpoints", True) and not validate_sadtalker_setup():
             raise RuntimeError("SadTalker setup validation failed. Please check the logs for missing components.")
         validation_duration = time.time() - validation_start_time
+        record_stage("validation", validation_duration, request_id)
         logging.info(f"[Request {request_id}] Setup validation completed in {validation_duration:.2f}s")
         
         # Step 5: Run SadTalker to generate video
+        report_progress("rendering", 30)
         sadtalker_start_time = time.time()
         logging.info(f"[Request {request_id}] Starting SadTalker inference...")
         logging.info(f"[Request {request_id}] Source Image: {source_image_path}")
@@ -233,28 +372,61 @@ def generate_talking_video(text, source_image_path=None, performance_mode=None):
         logging.info(f"[Request {request_id}] Result Dir: {result_dir}")
         
         try:
+            # Prefer the warm worker pool; it skips interpreter start-up and model loading
+            process_start_time = time.time()
+            pool_result = run_sadtalker_worker_pool(request_id, audio_path, source_image_path, result_dir, config)
+            if pool_result is not None:
+                elapsed_time = time.time() - process_start_time
+                for stage, stage_time in pool_result.get("timings", {}).items():
+                    record_stage(stage, stage_time, request_id, performance_mode=performance_mode)
+                record_stage("sadtalker", elapsed_time, request_id, engine="worker_pool",
+                             performance_mode=performance_mode)
+                performance_metrics = {
+                    "request_id": request_id,
+                    "performance_mode": performance_mode,
+                    "total_time": time.time() - start_time,
+                    "audio_generation_time": audio_duration,
+                    "validation_time": validation_duration,
+                    "sadtalker_time": elapsed_time,
+                    "sadtalker_stage_times": pool_result.get("timings", {}),
+                    "worker_pool": True,
+                    "gpu_available": gpu_available,
+                    "gpu_info": gpu_info,
+                    "system_resources": system_resources,
+                    "config": config
+                }
+                metrics_file = os.path.join(result_dir, f"performance_metrics_{request_id}.json")
+                with open(metrics_file, 'w') as f:
+                    json.dump(performance_metrics, f, indent=2)
+
+                video_path = pool_result["video_path"]
+                logging.info(f"[Request {request_id}] ✅ ACTUAL SADTALKER SUCCESS (worker pool): {video_path}")
+                logging.info(f"[Request {request_id}] Total generation time: {time.time() - start_time:.2f} seconds")
+                return video_path
+
             # Configure SadTalker command with performance optimizations
             logging.info(f"[Request {request_id}] Using direct Python call to avoid batch file hanging")
             
             # Use direct Python call to SadTalker inference script
             sadtalker_script = os.path.join(SADTALKER_ROOT_DIR, "inference_enhanced_with_video.py")
             if os.path.exists(sadtalker_script):
-                # Build optimized command with hardcoded fast settings
+                # Build the command for the admitted performance mode
                 sadtalker_cmd = [
                     "python",
                     sadtalker_script,
                     "--driven_audio", audio_path,
                     "--source_image", source_image_path,
                     "--result_dir", result_dir,
-                    "--preprocess", "resize",  # Use resize instead of crop for faster processing
+                    "--preprocess", SADTALKER_RENDER_OPTIONS["preprocess"],
                     "--still",  # Prevents expression changes
                     "--cpu",  # Force CPU mode for consistency
                     "--silent",  # Suppress verbose output
                     "--no-interrupt",  # Non-interactive mode
                     "--force-local-models",  # Use local models only
-                    "--size", "256",  # Use 256 size for faster processing
-                    "--enhancer", "gfpgan"  # Use GFPGAN enhancer
+                    *sadtalker_mode_args(config)
                 ]
+                face_cache_args, sadtalker_env = sadtalker_subprocess_options(sadtalker_cmd[1])
+                sadtalker_cmd += face_cache_args
                 
                 logging.info(f"[Request {request_id}] Executing SadTalker command: {' '.join(sadtalker_cmd)}")
                 logging.info(f"[Request {request_id}] Working directory: {SADTALKER_ROOT_DIR}")
@@ -268,6 +440,7 @@ def generate_talking_video(text, source_image_path=None, performance_mode=None):
                     process = subprocess.run(
                         sadtalker_cmd,
                         cwd=SADTALKER_ROOT_DIR,
+                        env=sadtalker_env,
                         capture_output=True,
                         text=True,
                         check=False,
@@ -275,6 +448,9 @@ def generate_talking_video(text, source_image_path=None, performance_mode=None):
                     )
                     elapsed_time = time.time() - process_start_time
                     logging.info(f"[Request {request_id}] Subprocess completed in {elapsed_time:.2f} seconds")
+                    # The subprocess is opaque, so only its total time is recorded
+                    record_stage("sadtalker", elapsed_time, request_id, engine="subprocess",
+                                 performance_mode=performance_mode)
                     
                     # Log performance metrics
                     performance_metrics = {
@@ -322,12 +498,13 @@ def generate_talking_video(text, source_image_path=None, performance_mode=None):
                     "--driven_audio", audio_path,
                     "--source_image", source_image_path,
                     "--result_dir", result_dir,
-                    "--preprocess", "resize",  # Use resize instead of crop for faster processing
+                    "--preprocess", SADTALKER_RENDER_OPTIONS["preprocess"],
                     "--still",  # Prevents expression changes
                     "--cpu",  # Force CPU mode for consistency
-                    "--size", "256",  # Use 256 size for faster processing
-                    "--enhancer", "gfpgan"  # Use GFPGAN enhancer
+                    *sadtalker_mode_args(config)
                 ]
+                face_cache_args, sadtalker_env = sadtalker_subprocess_options(sadtalker_cmd[1])
+                sadtalker_cmd += face_cache_args
                 
                 logging.info(f"[Request {request_id}] Executing SadTalker command: {' '.join(sadtalker_cmd)}")
                 logging.info(f"[Request {request_id}] Working directory: {SADTALKER_ROOT_DIR}")
@@ -339,6 +516,7 @@ def generate_talking_video(text, source_image_path=None, performance_mode=None):
                     process = subprocess.run(
                         sadtalker_cmd,
                         cwd=SADTALKER_ROOT_DIR,
+                        env=sadtalker_env,
                         capture_output=True,
                         text=True,
                         check=False,
@@ -346,6 +524,8 @@ def generate_talking_video(text, source_image_path=None, performance_mode=None):
                     )
                     elapsed_time = time.time() - process_start_time
                     logging.info(f"[Request {request_id}] Subprocess completed in {elapsed_time:.2f} seconds")
+                    record_stage("sadtalker", elapsed_time, request_id, engine="subprocess",
+                                 performance_mode=performance_mode)
                 except subprocess.TimeoutExpired:
                     elapsed_time = time.time() - process_start_time
                     logging.error(f"[Request {request_id}] SadTalker process timed out after {elapsed_time:.2f} seconds")
@@ -451,7 +631,7 @@ def generate_talking_video(text, source_image_path=None, performance_mode=None):
             
             # If there's a fallback video available, use it
             if os.path.exists(FALLBACK_VIDEO):
-                fallback_output = os.path.join(MEDIA_DIR, f"talking_head_{request_id}.mp4")
+                fallback_output = os.path.join(MEDIA_DIR, f"fallback_talking_head_{request_id}.mp4")
                 shutil.copy(FALLBACK_VIDEO, fallback_output)
                 logging.warning(f"[Request {request_id}] ⚠️ USING EMERGENCY FALLBACK - SadTalker completely failed")
                 logging.warning(f"[Request {request_id}] Emergency fallback video: {fallback_output}")
@@ -464,6 +644,106 @@ def generate_talking_video(text, source_image_path=None, performance_mode=None):
         logging.error(f"Error in generate_talking_video: {str(e)}")
         raise
 
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache():
+    """Return the process-wide video result cache."""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = VideoResultCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES)
+        return _result_cache
+
+def is_fallback_video(video_path):
+    """Fallback and emergency videos are named after the fallback asset."""
+    return "fallback" in os.path.basename(video_path).lower()
+
+@profile_execution_time
+def generate_talking_video(text, source_image_path=None, performance_mode=None, progress_callback=None):
+    """
+    Generate a talking head video from text input with performance optimization.
+
+    Identical requests (same normalized text, source image content and render
+    configuration) are answered from the result cache, and concurrent identical
+    requests share a single render.
+    Renders go through the admission controller, which may wait for resources
+    or step down to a cheaper performance mode.
+    
+    Args:
+        text (str): The text to be spoken by the talking head.
+        source_image_path (str, optional): Path to a custom source image. If None, default face is used.
+        performance_mode (str, optional): Performance mode - "fast", "balanced", or "quality"
+        progress_callback (callable, optional): Called as ``progress_callback(stage, percent)``.
+        
+    Returns:
+        str: Path to the generated video file.
+    """
+    if not source_image_path or not os.path.exists(source_image_path):
+        source_image_path = DEFAULT_FACE_IMAGE
+    mode = performance_mode if performance_mode in PERFORMANCE_CONFIGS else PERFORMANCE_MODE
+    admitted = {}
+    synthesis = {}
+    start_time = time.perf_counter()
+
+    def render():
+        # Only the render itself needs resources; cache hits are admitted for free
+        if progress_callback:
+            progress_callback("admission", 2)
+        admission_start_time = time.perf_counter()
+        with admission_controller.admit(mode) as admission:
+            record_stage("admission", time.perf_counter() - admission_start_time,
+                         requested_mode=mode, admitted_mode=admission.mode)
+            admitted["mode"] = admission.mode
+            return _render_talking_video(text, source_image_path, admission.mode, progress_callback, synthesis)
+
+    try:
+        if not USE_RESULT_CACHE or not os.path.exists(source_image_path):
+            video_path, cache_hit = render(), False
+        else:
+            video_path, cache_hit = _render_with_result_cache(
+                text, source_image_path, mode, admitted, synthesis, render)
+    except ResourcesExhaustedError:
+        _record_request("rejected", mode, admitted, start_time)
+        raise
+    except Exception:
+        _record_request("error", mode, admitted, start_time)
+        raise
+
+    if cache_hit:
+        logging.info(f"♻️ Serving cached talking head video: {video_path}")
+        if progress_callback:
+            progress_callback("cached", 100)
+    outcome = "cache_hit" if cache_hit else "fallback" if is_fallback_video(video_path) else "success"
+    _record_request(outcome, mode, admitted, start_time)
+    return video_path
+
+def _record_request(outcome, mode, admitted, start_time):
+    requests_total.inc(outcome=outcome)
+    log_event("request", outcome=outcome, requested_mode=mode, admitted_mode=admitted.get("mode"),
+              seconds=round(time.perf_counter() - start_time, 4))
+
+def _render_with_result_cache(text, source_image_path, mode, admitted, synthesis, render):
+    """Serve ``render()`` through the result cache; returns (video_path, cache_hit)."""
+    tts = tts_identity()
+    cache_config = {
+        "performance": PERFORMANCE_CONFIGS[mode],
+        "render": SADTALKER_RENDER_OPTIONS,
+        "tts": tts
+    }
+    cache = get_result_cache()
+    key = cache.key_for(text, source_image_path, cache_config)
+
+    def should_cache(path):
+        # A downgraded render must not be served for the mode that was asked for,
+        # nor a video voiced by a fallback TTS backend (e.g. the sine tone)
+        return (not is_fallback_video(path)
+                and admitted.get("mode") == mode
+                and synthesis.get("cacheable", False)
+                and synthesis.get("backend") == tts["backend"])
+
+    return cache.get_or_render(key, render, should_cache=should_cache)
+
 # Performance mode selection function
 def set_performance_mode(mode):
     """Set the global performance mode"""
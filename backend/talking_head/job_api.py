@@ -0,0 +1,187 @@
+"""
+FastAPI routes for asynchronous talking head generation.
+
+Both ``backend/main.py`` and ``backend/backend_with_sadtalker.py`` include this
+router. ``POST /talking-head/jobs`` returns a job id immediately; progress is
+available by polling ``GET /talking-head/jobs/{job_id}`` or as Server-Sent Events
+from ``GET /talking-head/jobs/{job_id}/events``. Pipeline metrics are scraped from
+``GET /metrics`` in Prometheus text format.
+"""
+import os
+import json
+import asyncio
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+
+from .generate_video import generate_talking_video, admission_controller, MEDIA_DIR, PERFORMANCE_CONFIGS
+from .segmented import generate_segmented_talking_video
+from .jobs import talking_head_jobs, JobQueueFullError
+from .resources import ResourcesExhaustedError
+from .metrics import registry as metrics_registry
+
+router = APIRouter()
+
+# Interval between checks for new job events on an open SSE stream
+EVENT_POLL_INTERVAL = 0.5
+
+metrics_registry.gauge("talking_head_jobs_queued", "Jobs waiting for a render slot",
+                       talking_head_jobs.queue_depth)
+metrics_registry.gauge("talking_head_jobs_running", "Jobs currently rendering",
+                       talking_head_jobs.running_count)
+metrics_registry.gauge("talking_head_admitted_renders", "Renders holding an admission reservation",
+                       lambda: admission_controller.status()["running"])
+
+
+class TalkingHeadJobRequest(BaseModel):
+    summary_text: str = Field(..., min_length=1, description="The text to convert to a talking head video")
+    source_image_path: Optional[str] = Field(None, description="Uploaded image path or /media/ URL")
+    performance_mode: Optional[str] = Field(None, description="fast, balanced or quality")
+    segmented: bool = Field(False, description="Render sentence-aligned segments in parallel")
+    stream: bool = Field(False, description="Publish an HLS playlist as segments finish (implies segmented)")
+
+
+def media_url(path: str) -> str:
+    """Map a file under MEDIA_DIR to the URL it is served from."""
+    relative_path = os.path.relpath(path, MEDIA_DIR)
+    return f"/media/{relative_path.replace(os.sep, '/')}"
+
+
+def resolve_source_image(source_image_path: Optional[str]) -> Optional[str]:
+    """Accept either a filesystem path or a /media/ URL for the source image."""
+    if not source_image_path:
+        return None
+    if not os.path.exists(source_image_path) and source_image_path.startswith("/media/"):
+        source_image_path = os.path.join(MEDIA_DIR, source_image_path.replace("/media/", "", 1))
+    if not os.path.exists(source_image_path):
+        raise FileNotFoundError(f"Source image not found: {source_image_path}")
+    return source_image_path
+
+
+def render_talking_head(text, source_image_path=None, performance_mode=None, segmented=False,
+                        stream=False, progress_callback=None):
+    """Job function: render a video and describe where it can be fetched."""
+    playlist = {}
+    if segmented or stream:
+        def report(stage, percent, playlist_path=None):
+            if playlist_path:
+                # Clients can start HLS playback as soon as the first segment is ready
+                playlist["url"] = media_url(playlist_path)
+                progress_callback(stage, percent, playlist["url"])
+            else:
+                progress_callback(stage, percent)
+
+        video_path = generate_segmented_talking_video(text, source_image_path, performance_mode,
+                                                      progress_callback=report, publish_hls=stream)
+    else:
+        video_path = generate_talking_video(text, source_image_path, performance_mode,
+                                            progress_callback=progress_callback)
+    if not video_path or not os.path.exists(video_path):
+        raise RuntimeError("Video generation failed internally.")
+    result = {"video_path": video_path, "video_url": media_url(video_path)}
+    if playlist:
+        result["playlist_url"] = playlist["url"]
+    return result
+
+
+def submit_talking_head_job(text, source_image_path=None, performance_mode=None, segmented=False, stream=False):
+    """
+    Queue a talking head render on the shared job manager.
+
+    Raises:
+        HTTPException: 503 when the queue is full.
+    """
+    try:
+        return talking_head_jobs.submit(
+            render_talking_head, text, source_image_path, performance_mode, segmented, stream,
+            params={"source_image_path": source_image_path, "performance_mode": performance_mode,
+                    "segmented": segmented, "stream": stream}
+        )
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+
+async def run_talking_head_job(text, source_image_path=None, performance_mode=None):
+    """Queue a render and await its result without blocking the event loop."""
+    job = submit_talking_head_job(text, source_image_path, performance_mode)
+    try:
+        return await talking_head_jobs.wait(job)
+    except ResourcesExhaustedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "60"})
+
+
+def _get_job_or_404(job_id):
+    job = talking_head_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.post("/talking-head/jobs", status_code=202)
+async def create_talking_head_job(request_data: TalkingHeadJobRequest, request: Request):
+    """Queue a talking head video and return its job id immediately."""
+    if request_data.performance_mode and request_data.performance_mode not in PERFORMANCE_CONFIGS:
+        raise HTTPException(status_code=400, detail=f"Unknown performance mode: {request_data.performance_mode}")
+    try:
+        source_image_path = resolve_source_image(request_data.source_image_path)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    job = submit_talking_head_job(request_data.summary_text, source_image_path, request_data.performance_mode,
+                                  segmented=request_data.segmented, stream=request_data.stream)
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id,
+        "status": job.status,
+        "queue_depth": talking_head_jobs.queue_depth(),
+        "status_url": f"/talking-head/jobs/{job.id}",
+        "events_url": f"/talking-head/jobs/{job.id}/events"
+    })
+
+
+@router.get("/talking-head/resources")
+async def get_talking_head_resources():
+    """Admission state: running renders, reservations and the latest resource sample."""
+    status = admission_controller.status()
+    status["queue_depth"] = talking_head_jobs.queue_depth()
+    return status
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Stage latency histograms, request counters and queue gauges for Prometheus."""
+    return PlainTextResponse(metrics_registry.render_prometheus(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/talking-head/jobs/{job_id}")
+async def get_talking_head_job(job_id: str):
+    """Poll the status, progress and result of a job."""
+    return _get_job_or_404(job_id).to_dict()
+
+
+@router.get("/talking-head/jobs/{job_id}/events")
+async def stream_talking_head_job_events(job_id: str, request: Request):
+    """Stream job status and progress events as Server-Sent Events."""
+    job = _get_job_or_404(job_id)
+
+    async def event_stream():
+        next_event = 0
+        while True:
+            # Read the flag before draining: the terminal event is appended before
+            # the job is marked finished, so this drain is sure to include it
+            finished = job.finished
+            for event in job.events_since(next_event):
+                next_event = event["id"] + 1
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if finished:
+                break
+            if await request.is_disconnected():
+                logging.info(f"Client stopped following job {job_id}")
+                break
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
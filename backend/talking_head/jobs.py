@@ -0,0 +1,172 @@
+"""
+Background job subsystem for talking head generation.
+
+``generate_talking_video`` blocks for minutes. Calling it from an ``async def``
+handler stalls the uvicorn event loop and every other endpoint with it. Jobs
+submitted here run on a bounded thread pool instead. The caller gets a job id
+straight away and can poll the job or follow its progress events.
+"""
+import os
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of videos rendered at the same time
+TALKING_HEAD_MAX_CONCURRENCY = int(os.getenv("TALKING_HEAD_MAX_CONCURRENCY", "1"))
+# Maximum number of jobs waiting for a free slot before new submissions are rejected
+TALKING_HEAD_MAX_QUEUE_DEPTH = int(os.getenv("TALKING_HEAD_MAX_QUEUE_DEPTH", "10"))
+# How long finished jobs stay available for polling
+JOB_RETENTION_SECONDS = 3600
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when the job queue has reached its configured depth."""
+
+
+class TalkingHeadJob:
+    """State, progress and event history of a single generation job."""
+
+    def __init__(self, params=None):
+        self.id = str(uuid.uuid4())
+        self.params = params or {}
+        self.status = QUEUED
+        self.progress = 0
+        self.stage = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []
+        self.future = None
+        self._lock = threading.Lock()
+        self._add_event("status", status=QUEUED)
+
+    @property
+    def finished(self):
+        return self.status in (COMPLETED, FAILED)
+
+    def _add_event(self, event_type, **data):
+        with self._lock:
+            self._append_event(event_type, **data)
+
+    def _append_event(self, event_type, **data):
+        event = {"id": len(self.events), "type": event_type, "time": time.time()}
+        event.update(data)
+        self.events.append(event)
+
+    def _finish(self, status, **data):
+        """
+        Record the terminal event, then mark the job finished.
+
+        Both happen under the event lock, so anyone who sees ``finished`` also
+        sees the terminal event in ``events_since``.
+        """
+        with self._lock:
+            self.finished_at = time.time()
+            if status == COMPLETED:
+                self.progress = 100
+            self._append_event("status", status=status, **data)
+            self.status = status
+
+    def report_progress(self, stage, progress, message=None):
+        """Progress callback handed to the job function."""
+        self.stage = stage
+        self.progress = max(self.progress, int(progress))
+        self._add_event("progress", stage=stage, progress=self.progress, message=message)
+
+    def events_since(self, index):
+        with self._lock:
+            return self.events[index:]
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_seconds": (self.started_at or time.time()) - self.created_at,
+        }
+
+
+class JobManager:
+    """Runs jobs on a bounded executor and keeps their state for polling."""
+
+    def __init__(self, max_concurrency=TALKING_HEAD_MAX_CONCURRENCY, max_queue_depth=TALKING_HEAD_MAX_QUEUE_DEPTH):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_depth = max_queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="talking-head-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def queue_depth(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == QUEUED)
+
+    def running_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == RUNNING)
+
+    def submit(self, func, *args, params=None, **kwargs):
+        """
+        Queue ``func(*args, progress_callback=..., **kwargs)`` and return its job.
+
+        Raises:
+            JobQueueFullError: If ``max_queue_depth`` jobs are already waiting.
+        """
+        self._prune()
+        job = TalkingHeadJob(params)
+        with self._lock:
+            queued = sum(1 for j in self._jobs.values() if j.status == QUEUED)
+            if queued >= self.max_queue_depth:
+                raise JobQueueFullError(f"Talking head queue is full ({queued} jobs waiting)")
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, func, args, kwargs)
+        logger.info(f"Queued talking head job {job.id} ({queued + 1} waiting)")
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        job.status = RUNNING
+        job.started_at = time.time()
+        job._add_event("status", status=RUNNING)
+        try:
+            job.result = func(*args, progress_callback=job.report_progress, **kwargs)
+            job._finish(COMPLETED, result=job.result)
+            return job.result
+        except Exception as e:
+            logger.error(f"Talking head job {job.id} failed: {e}")
+            job.error = str(e)
+            job._finish(FAILED, error=job.error)
+            raise
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    async def wait(self, job):
+        """Await a job from async code without blocking the event loop."""
+        return await asyncio.wrap_future(job.future)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+                del self._jobs[job_id]
+
+
+talking_head_jobs = JobManager()
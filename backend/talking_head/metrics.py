@@ -0,0 +1,197 @@
+"""
+Instrumentation for the talking head pipeline.
+
+Per-stage spans (TTS, validation, 3DMM extraction, audio2coeff, face render,
+enhancer, ffmpeg mux, ...) feed latency histograms and counters that are exposed
+in Prometheus text format on ``/metrics``. Every span is also appended as one
+JSON line to a size-rotated log file, so regressions and tail latency can be
+analysed offline.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+METRICS_LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+METRICS_LOG_FILE = os.path.join(METRICS_LOG_DIR, "talking_head_metrics.jsonl")
+
+# Rendering takes seconds to many minutes, so buckets are spread wide
+DEFAULT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 900, float("inf"))
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    labels = _format_labels(self.label_names, key, ("le", _format_bound(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge:
+    """A gauge whose value is read from a callback at scrape time."""
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+
+    def render(self):
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(Counter(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def gauge(self, name, help_text, read):
+        return self._register(Gauge(name, help_text, read))
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    "talking_head_stage_seconds", "Duration of talking head pipeline stages", ("stage",)
+)
+function_seconds = registry.histogram(
+    "talking_head_function_seconds", "Duration of profiled pipeline functions", ("function",)
+)
+requests_total = registry.counter(
+    "talking_head_requests_total", "Talking head requests by outcome", ("outcome",)
+)
+stage_errors_total = registry.counter(
+    "talking_head_stage_errors_total", "Pipeline stages that raised", ("stage",)
+)
+
+_event_logger = None
+_event_logger_lock = threading.Lock()
+
+
+def _get_event_logger():
+    global _event_logger
+    with _event_logger_lock:
+        if _event_logger is None:
+            os.makedirs(METRICS_LOG_DIR, exist_ok=True)
+            handler = RotatingFileHandler(METRICS_LOG_FILE, maxBytes=10 * 1024 * 1024, backupCount=5,
+                                          encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            event_logger = logging.getLogger("talking_head.metrics.events")
+            event_logger.setLevel(logging.INFO)
+            event_logger.propagate = False
+            event_logger.addHandler(handler)
+            _event_logger = event_logger
+        return _event_logger
+
+
+def log_event(event, **fields):
+    """Append one JSON line to the rotating metrics log."""
+    record = {"ts": time.time(), "event": event}
+    record.update(fields)
+    try:
+        _get_event_logger().info(json.dumps(record, default=str))
+    except OSError as e:
+        logging.warning(f"Could not write metrics event: {e}")
+
+
+def record_stage(stage, seconds, request_id=None, **fields):
+    """Record a finished stage in the histogram and the JSONL log."""
+    stage_seconds.observe(seconds, stage=stage)
+    log_event("stage", stage=stage, seconds=round(seconds, 4), request_id=request_id, **fields)
+
+
+@contextmanager
+def stage_span(stage, request_id=None, **fields):
+    """Time the enclosed block as pipeline stage ``stage``."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_errors_total.inc(stage=stage)
+        record_stage(stage, time.perf_counter() - start, request_id, error=True, **fields)
+        raise
+    record_stage(stage, time.perf_counter() - start, request_id, **fields)
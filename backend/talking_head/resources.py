@@ -0,0 +1,214 @@
+"""
+Resource-aware admission control for SadTalker renders.
+
+A background ``ResourceSampler`` keeps a fresh snapshot of CPU and memory so the
+request path never blocks on ``psutil.cpu_percent(interval=1)``. The
+``AdmissionController`` uses those samples plus the reservations of renders that
+are already running to decide whether a new render may start. Under pressure it
+steps the performance mode down (quality -> balanced -> fast); when even the
+cheapest mode does not fit it queues the job until resources free up, and
+rejects it after a timeout.
+"""
+import time
+import logging
+import threading
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Performance modes from most to least expensive
+MODE_ORDER = ["quality", "balanced", "fast"]
+
+
+class ResourcesExhaustedError(RuntimeError):
+    """Raised when a render could not be admitted before the admission timeout."""
+
+
+class ResourceSampler:
+    """Samples CPU and memory on a daemon thread; readers get the latest snapshot."""
+
+    def __init__(self, interval=2.0):
+        self.interval = interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            psutil.cpu_percent(interval=None)  # prime the counter; the first reading is meaningless
+            self._sample()
+            self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception as e:
+                logger.warning(f"Resource sampling failed: {e}")
+
+    def _sample(self):
+        memory = psutil.virtual_memory()
+        self._snapshot = {
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "cpu_count": psutil.cpu_count() or 1,
+            "memory_percent": memory.percent,
+            "available_memory_gb": memory.available / (1024**3),
+            "sampled_at": time.time(),
+        }
+
+    def latest(self):
+        """Return the most recent snapshot, starting the sampler on first use."""
+        if self._thread is None:
+            self.start()
+        return dict(self._snapshot)
+
+
+class Admission:
+    """A granted reservation; release it (or leave the ``with`` block) when the render ends."""
+
+    def __init__(self, controller, mode, memory_gb, cores):
+        self.controller = controller
+        self.mode = mode
+        self.memory_gb = memory_gb
+        self.cores = cores
+        self.admitted_at = time.time()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class AdmissionController:
+    """
+    Admits renders based on measured free memory and cores.
+
+    Each performance mode declares ``min_free_memory_gb`` and ``cores`` in
+    ``PERFORMANCE_CONFIGS``. A render is admitted when the sampled available
+    memory minus the memory reserved by renders the sample does not reflect yet
+    covers the mode's requirement, enough cores are unreserved and CPU load is
+    below ``max_cpu_percent``.
+
+    Renders that were running well before the sample already show up in its
+    available memory, so only reservations made after the sample, or less than
+    ``memory_ramp_seconds`` before it (a render takes a while to load its
+    models), are subtracted.
+    """
+
+    def __init__(self, performance_configs, sampler, max_cpu_percent=90, auto_downgrade=True,
+                 admission_timeout=300, poll_interval=1.0, memory_ramp_seconds=30):
+        self.performance_configs = performance_configs
+        self.sampler = sampler
+        self.max_cpu_percent = max_cpu_percent
+        self.auto_downgrade = auto_downgrade
+        self.admission_timeout = admission_timeout
+        self.poll_interval = poll_interval
+        self.memory_ramp_seconds = memory_ramp_seconds
+        self._condition = threading.Condition()
+        self._admissions = []
+        self._reserved_memory_gb = 0.0
+        self._reserved_cores = 0
+        self._running = 0
+
+    def _unsampled_memory_gb(self, snapshot):
+        """Memory reserved by renders too recent to be reflected in ``snapshot``."""
+        cutoff = snapshot["sampled_at"] - self.memory_ramp_seconds
+        return sum(admission.memory_gb for admission in self._admissions if admission.admitted_at > cutoff)
+
+    def _cores_for(self, mode, snapshot):
+        """Cores a render needs, capped at the host's, so small hosts can run every mode."""
+        return min(self.performance_configs[mode].get("cores", 1), snapshot["cpu_count"])
+
+    def _fits(self, mode, snapshot):
+        config = self.performance_configs[mode]
+        free_memory = snapshot["available_memory_gb"] - self._unsampled_memory_gb(snapshot)
+        free_cores = snapshot["cpu_count"] - self._reserved_cores
+        if free_memory < config.get("min_free_memory_gb", 0):
+            return False
+        if free_cores < self._cores_for(mode, snapshot):
+            return False
+        # With nothing running, high CPU load is someone else's; don't starve forever
+        return self._running == 0 or snapshot["cpu_percent"] < self.max_cpu_percent
+
+    def _candidate_modes(self, requested_mode):
+        if not self.auto_downgrade or requested_mode not in MODE_ORDER:
+            return [requested_mode]
+        return MODE_ORDER[MODE_ORDER.index(requested_mode):]
+
+    def admit(self, requested_mode, timeout=None):
+        """
+        Block until a render can start and reserve resources for it.
+
+        Returns:
+            Admission: The granted reservation; ``admission.mode`` may be cheaper
+            than ``requested_mode`` when the host is under pressure.
+
+        Raises:
+            ResourcesExhaustedError: If nothing fits before the timeout.
+        """
+        timeout = self.admission_timeout if timeout is None else timeout
+        deadline = time.time() + timeout
+        waited = False
+        with self._condition:
+            while True:
+                snapshot = self.sampler.latest()
+                for mode in self._candidate_modes(requested_mode):
+                    if self._fits(mode, snapshot):
+                        return self._reserve(mode, requested_mode, snapshot)
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise ResourcesExhaustedError(
+                        f"Not enough free resources for a '{requested_mode}' render "
+                        f"({snapshot['available_memory_gb']:.1f}GB free, CPU {snapshot['cpu_percent']}%, "
+                        f"{self._running} renders running)"
+                    )
+                if not waited:
+                    logger.info(f"⏳ Render queued for resources ({self._running} running)")
+                    waited = True
+                self._condition.wait(min(self.poll_interval, remaining))
+
+    def _reserve(self, mode, requested_mode, snapshot):
+        config = self.performance_configs[mode]
+        admission = Admission(self, mode, config.get("min_free_memory_gb", 0), self._cores_for(mode, snapshot))
+        self._admissions.append(admission)
+        self._reserved_memory_gb += admission.memory_gb
+        self._reserved_cores += admission.cores
+        self._running += 1
+        if mode != requested_mode:
+            logger.warning(f"⚠️ Host under pressure ({snapshot['available_memory_gb']:.1f}GB free, "
+                           f"CPU {snapshot['cpu_percent']}%), downgrading '{requested_mode}' render to '{mode}'")
+        return admission
+
+    def _release(self, admission):
+        with self._condition:
+            self._admissions.remove(admission)
+            self._reserved_memory_gb -= admission.memory_gb
+            self._reserved_cores -= admission.cores
+            self._running -= 1
+            self._condition.notify_all()
+
+    def status(self):
+        """Current reservations and the latest resource snapshot."""
+        with self._condition:
+            return {
+                "running": self._running,
+                "reserved_memory_gb": round(self._reserved_memory_gb, 2),
+                "reserved_cores": self._reserved_cores,
+                "resources": self.sampler.latest(),
+            }
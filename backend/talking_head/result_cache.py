@@ -0,0 +1,149 @@
+"""
+Content-addressed cache of rendered talking head videos.
+
+A video is fully determined by the spoken text, the source face and the render
+configuration. Entries are keyed by a hash of those three inputs and stored as
+MP4 files under ``MEDIA_DIR`` so they can be served directly. Concurrent requests
+for the same key share a single render (single-flight), and the least recently
+used files are evicted once the cache exceeds its byte budget.
+"""
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import Future
+
+from .utils import sha256_file
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different summaries share an entry."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+class VideoResultCache:
+    """Size-bounded LRU cache of generated videos with single-flight rendering."""
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> Future shared by concurrent identical requests
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(text, image_path, config):
+        """Hash of normalized text, source image content and render configuration."""
+        payload = json.dumps({
+            "text": normalize_text(text),
+            "image": sha256_file(image_path),
+            "config": config,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def get(self, key):
+        """Return the cached video path for ``key`` or None."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            os.utime(path)  # mark as most recently used
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, video_path):
+        """Move a rendered video into the cache and return the cached path."""
+        cached_path = self._path(key)
+        try:
+            os.replace(video_path, cached_path)
+        except OSError:
+            # Different filesystem: stage a copy next to the entry, then drop the source
+            fd, staging_path = tempfile.mkstemp(suffix=".mp4.tmp", dir=self.cache_dir)
+            os.close(fd)
+            shutil.copyfile(video_path, staging_path)
+            os.replace(staging_path, cached_path)
+            os.remove(video_path)
+        self._evict(keep=cached_path)
+        return cached_path
+
+    def get_or_render(self, key, render, should_cache=lambda path: True):
+        """
+        Return the cached video for ``key`` or call ``render()`` exactly once.
+
+        Threads asking for a key that is already being rendered wait for that
+        render instead of starting their own. They count as a cache hit only if
+        the shared render was stored, so fallbacks are never reported as hits.
+
+        Args:
+            key (str): Cache key from ``key_for``.
+            render (callable): Produces a video and returns its path.
+            should_cache (callable): Decides whether a rendered path may be stored
+                (fallback videos must not be).
+
+        Returns:
+            tuple: (video_path, cache_hit)
+        """
+        cached = self.get(key)
+        if cached:
+            return cached, True
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not owner:
+            logger.info(f"Waiting for in-flight render of {key[:12]}")
+            return future.result()
+
+        try:
+            video_path = render()
+            stored = bool(video_path) and should_cache(video_path)
+            if stored:
+                video_path = self.put(key, video_path)
+            future.set_result((video_path, stored))
+            return video_path, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _evict(self, keep=None):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if not name.endswith(".mp4") or path == keep:
+                    continue
+                try:
+                    entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+                except FileNotFoundError:
+                    continue
+
+            total_bytes = sum(size for _, size, _ in entries)
+            if keep and os.path.exists(keep):
+                total_bytes += os.path.getsize(keep)
+
+            entries.sort()
+            while entries and total_bytes > self.max_bytes:
+                _, size, path = entries.pop(0)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+                logger.info(f"Evicted cached video {os.path.basename(path)}")
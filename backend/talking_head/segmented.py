@@ -0,0 +1,221 @@
+"""
+Chunked talking head rendering for long summaries.
+
+A long summary produces one long TTS file, and nothing exists until SadTalker has
+rendered all of it. Here the text is split at sentence boundaries, the segments
+are rendered in parallel across the worker pool, and the results are joined with
+an ffmpeg stream copy (no re-encode). Optionally an HLS playlist is published
+and extended as segments finish in order, so playback can start after the first
+segment.
+"""
+import os
+import re
+import math
+import uuid
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from .generate_video import (
+    generate_talking_video, is_fallback_video, MEDIA_DIR, SADTALKER_POOL_SIZE
+)
+from .metrics import stage_span
+
+logger = logging.getLogger(__name__)
+
+# Segments are packed from whole sentences up to this many characters
+DEFAULT_SEGMENT_CHARS = 400
+# Conservative speaking rate bounding HLS segment durations (gTTS and Piper speak ~15 chars/s)
+MIN_CHARS_PER_SECOND = 10
+
+_sentence_splitter = None
+
+
+def set_sentence_splitter(splitter):
+    """
+    Use ``splitter(text, max_length)`` to cut text into segments.
+
+    ``backend/main.py`` registers its spaCy based ``split_into_chunks`` here; the
+    regex splitter below is only used when no splitter was registered.
+    """
+    global _sentence_splitter
+    _sentence_splitter = splitter
+
+
+def _regex_split(text, max_length):
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', text) if s.strip()]
+    chunks, chunk = [], ''
+    for sentence in sentences:
+        if chunk and len(chunk) + len(sentence) + 1 > max_length:
+            chunks.append(chunk.strip())
+            chunk = ''
+        chunk += sentence + ' '
+    if chunk.strip():
+        chunks.append(chunk.strip())
+    return chunks
+
+
+def split_text_into_segments(text, max_length=DEFAULT_SEGMENT_CHARS):
+    """Split text into sentence-aligned segments of at most ``max_length`` characters."""
+    splitter = _sentence_splitter or _regex_split
+    return [chunk for chunk in splitter(text, max_length) if chunk]
+
+
+def concat_videos(video_paths, output_path):
+    """Join MP4 segments with identical codecs using the concat demuxer (stream copy)."""
+    list_path = output_path + ".txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in video_paths:
+            escaped = os.path.abspath(path).replace("\\", "/").replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        process = subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+             "-i", list_path, "-c", "copy", "-movflags", "+faststart", output_path],
+            capture_output=True, text=True
+        )
+        if process.returncode != 0:
+            raise RuntimeError(f"FFmpeg concat failed: {process.stderr}")
+    finally:
+        os.remove(list_path)
+    return output_path
+
+
+class HLSPlaylist:
+    """An EVENT playlist that grows by one MPEG-TS segment per finished render."""
+
+    def __init__(self, output_dir, target_duration):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, "playlist.m3u8")
+        # Clients read the target duration once; it must never change after publishing
+        self.target_duration = max(1, int(math.ceil(target_duration)))
+        self.segments = []
+        self._write(ended=False)
+
+    def append(self, video_path, index):
+        """Remux a finished MP4 segment to MPEG-TS and add it to the playlist."""
+        ts_name = f"segment_{index:03d}.ts"
+        process = subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-i", video_path, "-c", "copy",
+             "-bsf:v", "h264_mp4toannexb", "-f", "mpegts", os.path.join(self.output_dir, ts_name)],
+            capture_output=True, text=True
+        )
+        if process.returncode != 0:
+            raise RuntimeError(f"FFmpeg HLS remux failed: {process.stderr}")
+        duration = probe_duration(video_path)
+        if round(duration) > self.target_duration:
+            logger.warning(f"HLS segment {index} lasts {duration:.2f}s, over the "
+                           f"{self.target_duration}s target duration")
+        self.segments.append((ts_name, duration))
+        self._write(ended=False)
+
+    def finish(self):
+        self._write(ended=True)
+
+    def _write(self, ended):
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{self.target_duration}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for ts_name, duration in self.segments:
+            lines.append(f"#EXTINF:{duration:.3f},")
+            lines.append(ts_name)
+        if ended:
+            lines.append("#EXT-X-ENDLIST")
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)  # readers never see a half-written playlist
+
+
+def probe_duration(video_path):
+    """Return a media file's duration in seconds using ffprobe."""
+    process = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", video_path],
+        capture_output=True, text=True
+    )
+    try:
+        return float(process.stdout.strip())
+    except ValueError:
+        return 0.0
+
+
+def generate_segmented_talking_video(text, source_image_path=None, performance_mode=None,
+                                     progress_callback=None, max_segment_chars=DEFAULT_SEGMENT_CHARS,
+                                     publish_hls=False):
+    """
+    Render a long text as sentence-aligned segments in parallel and join them.
+
+    Args:
+        text (str): The text to be spoken by the talking head.
+        source_image_path (str, optional): Path to a custom source image.
+        performance_mode (str, optional): Performance mode - "fast", "balanced", or "quality"
+        progress_callback (callable, optional): Called as ``progress_callback(stage, percent)``;
+            when ``publish_hls`` is set each ready segment is reported as
+            ``progress_callback("segment_ready", percent, playlist_path)``.
+        max_segment_chars (int): Maximum characters per rendered segment.
+        publish_hls (bool): Also publish an HLS playlist that grows as segments finish.
+
+    Returns:
+        str: Path to the concatenated MP4.
+    """
+    segments = split_text_into_segments(text, max_segment_chars)
+    if len(segments) <= 1 and not publish_hls:
+        return generate_talking_video(text, source_image_path, performance_mode, progress_callback=progress_callback)
+    if not segments:
+        raise ValueError("No text to render")
+
+    request_id = str(uuid.uuid4())
+    output_dir = os.path.join(MEDIA_DIR, f"segmented_{request_id}")
+    os.makedirs(output_dir, exist_ok=True)
+    logging.info(f"[Request {request_id}] Rendering {len(segments)} segments with {SADTALKER_POOL_SIZE} workers")
+
+    playlist = None
+    if publish_hls:
+        # Published before any segment exists, so the target comes from a slow speaking rate
+        longest = max(len(segment) for segment in segments)
+        playlist = HLSPlaylist(output_dir, longest / MIN_CHARS_PER_SECOND)
+
+    def report(stage, percent, message=None):
+        if progress_callback:
+            if message is None:
+                progress_callback(stage, percent)
+            else:
+                progress_callback(stage, percent, message)
+
+    video_paths = []
+    with ThreadPoolExecutor(max_workers=max(1, SADTALKER_POOL_SIZE)) as executor:
+        futures = [
+            executor.submit(generate_talking_video, segment, source_image_path, performance_mode)
+            for segment in segments
+        ]
+        try:
+            # Collect in order so the playlist only ever grows at its end
+            for index, future in enumerate(futures):
+                video_path = future.result()
+                if is_fallback_video(video_path):
+                    logging.warning(f"[Request {request_id}] Segment {index} fell back, returning fallback video")
+                    return video_path
+                video_paths.append(video_path)
+                percent = 5 + 90 * (index + 1) / len(segments)
+                if playlist:
+                    with stage_span("hls_remux", request_id):
+                        playlist.append(video_path, index)
+                    report("segment_ready", percent, playlist.path)
+                else:
+                    report("rendering", percent)
+        finally:
+            for pending in futures:
+                pending.cancel()
+            # End the playlist on every exit, or clients already playing it poll forever
+            if playlist:
+                playlist.finish()
+
+    report("concatenating", 95)
+    with stage_span("ffmpeg_concat", request_id, segments=len(video_paths)):
+        output_path = concat_videos(video_paths, os.path.join(output_dir, "talking_head.mp4"))
+    logging.info(f"[Request {request_id}] ✅ Segmented talking head video: {output_path}")
+    return output_path
@@ -1,9 +1,18 @@
 import os
+import sys
+import abc
 import time
 import logging
+import threading
 import numpy as np
-from scipy.io import wavfile
-from gtts import gTTS
+
+# The sentence audio cache lives in the model package and is shared with its TTS call sites
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+from model.src.app.audio_cache import (
+    get_audio_cache, gtts_synthesize, join_pcm, pcm_to_wav, split_sentences, SAMPLE_RATE
+)
 
 # Configure logging
 logging.basicConfig(
@@ -16,80 +25,263 @@ logger = logging.getLogger(__name__)
 MEDIA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "media")
 os.makedirs(MEDIA_DIR, exist_ok=True)
 
+# SadTalker consumes 16 kHz mono audio (SAMPLE_RATE), so every backend produces exactly that.
+# Backend selection: "piper" (local, offline), "gtts" (network) or "mock" (sine wave).
+# Without TTS_BACKEND, Piper is used when a voice model is present, otherwise gTTS.
+TTS_BACKEND = os.getenv("TTS_BACKEND")
+PIPER_MODEL_DIR = os.getenv(
+    "PIPER_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "piper")
+)
+PIPER_VOICE = os.getenv("PIPER_VOICE", "en_US-lessac-medium")
+
+
+def to_pcm16(samples, sample_rate):
+    """Convert float or int16 samples at ``sample_rate`` to 16 kHz mono int16."""
+    samples = np.asarray(samples)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if samples.dtype != np.int16:
+        samples = np.clip(samples, -1.0, 1.0) * 32767
+    if sample_rate != SAMPLE_RATE:
+        from scipy.signal import resample_poly
+        divisor = np.gcd(int(sample_rate), SAMPLE_RATE)
+        samples = resample_poly(samples.astype(np.float32), SAMPLE_RATE // divisor, int(sample_rate) // divisor)
+    return np.clip(samples, -32768, 32767).astype(np.int16)
+
+
+class TTSBackend(abc.ABC):
+    """
+    Interface for speech synthesis engines.
+
+    ``synthesize`` receives a batch of sentences and returns one 16 kHz mono
+    int16 array per sentence, in order.
+    """
+
+    name = "base"
+    default_voice = None
+    # Whether output goes through the shared sentence cache
+    cacheable = True
+
+    @abc.abstractmethod
+    def synthesize(self, sentences, voice):
+        """Return one int16 array per sentence in ``sentences``."""
+
+
+class PiperBackend(TTSBackend):
+    """Local neural TTS with Piper; each voice model is loaded once per process."""
+
+    name = "piper"
+    default_voice = PIPER_VOICE
+
+    def __init__(self, model_dir=PIPER_MODEL_DIR):
+        from piper.voice import PiperVoice  # optional dependency: pip install piper-tts
+        self._voice_class = PiperVoice
+        self.model_dir = model_dir
+        self._voices = {}
+        self._lock = threading.Lock()
+
+    def model_path(self, voice):
+        return os.path.join(self.model_dir, f"{voice}.onnx")
+
+    def _load(self, voice):
+        if voice not in self._voices:
+            start_time = time.time()
+            self._voices[voice] = self._voice_class.load(self.model_path(voice))
+            logger.info(f"Loaded Piper voice {voice} in {time.time() - start_time:.2f}s")
+        return self._voices[voice]
+
+    def synthesize(self, sentences, voice):
+        # The ONNX session is not shared across threads; one batch runs at a time
+        with self._lock:
+            piper_voice = self._load(voice)
+            sample_rate = piper_voice.config.sample_rate
+            return [to_pcm16(np.frombuffer(self._raw_audio(piper_voice, sentence), dtype=np.int16), sample_rate)
+                    for sentence in sentences]
+
+    @staticmethod
+    def _raw_audio(piper_voice, sentence):
+        if hasattr(piper_voice, "synthesize_stream_raw"):
+            return b"".join(piper_voice.synthesize_stream_raw(sentence))
+        # piper-tts >= 1.3 yields AudioChunk objects instead of raw bytes
+        return b"".join(chunk.audio_int16_bytes for chunk in piper_voice.synthesize(sentence))
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS over the network; same synthesis as the model service."""
+
+    name = "gtts"
+    default_voice = "en"
+
+    def synthesize(self, sentences, voice):
+        return [np.frombuffer(pcm, dtype=np.int16) for pcm in gtts_synthesize(sentences, voice)]
+
+
+class SineBackend(TTSBackend):
+    """Harmonic sine tone sized to the text; lets SadTalker run without any TTS."""
+
+    name = "mock"
+    default_voice = "sine"
+    cacheable = False
+
+    def synthesize(self, sentences, voice):
+        return [self._tone(max(len(sentence) * 0.05, 1.0)) for sentence in sentences]
+
+    @staticmethod
+    def _tone(duration):
+        t = np.linspace(0, duration, int(SAMPLE_RATE * duration), endpoint=False)
+        frequencies = [440, 880, 1320]  # A4, A5, E6
+        audio_data = np.zeros_like(t)
+        for i, freq in enumerate(frequencies):
+            # Add harmonics with decreasing amplitude
+            audio_data += 0.5 / (i + 1) * np.sin(2 * np.pi * freq * t)
+        audio_data = audio_data / np.max(np.abs(audio_data)) * 0.9
+        return (audio_data * 32767).astype(np.int16)
+
+
+class TTSEngine:
+    """
+    Synthesizes utterances sentence by sentence with a chain of backends.
+
+    Sentences already synthesized for the same (backend, voice) come from the
+    shared on-disk sentence cache; the rest are sent to the backend as one batch.
+    When a backend fails, the next one in the chain synthesizes the whole
+    utterance, so one voice is never mixed with another.
+    """
+
+    def __init__(self, backends, cache=None):
+        self.backends = backends
+        self.cache = cache or get_audio_cache()
+
+    def _synthesize_with(self, backend, sentences, voice):
+        voice = voice or backend.default_voice
+
+        def synthesize(batch):
+            return [pcm.tobytes() for pcm in backend.synthesize(batch, voice)]
+
+        if not backend.cacheable:
+            return synthesize(sentences)
+        parts, synthesized = self.cache.get_or_synthesize(sentences, backend.name, voice, synthesize)
+        logger.info(f"TTS [{backend.name}] {len(sentences)} sentences, {synthesized} synthesized")
+        return parts
+
+    def identity(self, voice=None):
+        """The (backend, voice) an utterance is expected to come from when nothing fails."""
+        primary = self.backends[0]
+        return {"backend": primary.name, "voice": voice or primary.default_voice}
+
+    def synthesize(self, text, voice=None):
+        """Return the utterance for ``text`` as 16 kHz mono 16-bit PCM bytes."""
+        return self.synthesize_with_backend(text, voice)[0]
+
+    def synthesize_with_backend(self, text, voice=None):
+        """Return ``(pcm, backend)`` where ``backend`` is the one that produced the audio."""
+        sentences = split_sentences(text) or [text]
+        last_error = None
+        for backend in self.backends:
+            try:
+                pcm = join_pcm(self._synthesize_with(backend, sentences, voice if backend is self.backends[0] else None))
+                return pcm, backend
+            except Exception as e:
+                logger.warning(f"TTS backend {backend.name} failed: {e}")
+                last_error = e
+        raise RuntimeError(f"All TTS backends failed: {last_error}")
+
+    def synthesize_to_file(self, text, audio_path, voice=None):
+        """Write the utterance as a WAV file and return the backend that produced it."""
+        pcm, backend = self.synthesize_with_backend(text, voice)
+        pcm_to_wav(pcm, audio_path)
+        return backend
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _create_backend(name):
+    if name == "piper":
+        return PiperBackend()
+    if name == "gtts":
+        return GTTSBackend()
+    if name == "mock":
+        return SineBackend()
+    raise ValueError(f"Unknown TTS backend: {name}")
+
+
+def get_tts_engine():
+    """Return the process-wide TTS engine, loading its backends on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            if TTS_BACKEND:
+                names = [TTS_BACKEND]
+            elif os.path.exists(os.path.join(PIPER_MODEL_DIR, f"{PIPER_VOICE}.onnx")):
+                names = ["piper", "gtts"]
+            else:
+                names = ["gtts"]
+            backends = []
+            for name in names:
+                try:
+                    backends.append(_create_backend(name))
+                except ImportError as e:
+                    logger.warning(f"TTS backend {name} unavailable: {e}")
+            if not any(isinstance(backend, SineBackend) for backend in backends):
+                backends.append(SineBackend())  # always produce audio, as the mock did
+            _engine = TTSEngine(backends)
+            logger.info(f"TTS backends: {', '.join(backend.name for backend in backends)}")
+        return _engine
+
+
 def text_to_speech_mock(text, request_id=None):
     """
-    Creates a mock audio file for testing SadTalker.
-    In production, replace with actual TTS system.
-    
+    Creates an audio file for testing SadTalker.
+    Kept for existing callers; synthesis goes through ``text_to_speech_real``.
+
     Args:
         text (str): Text to convert to speech
         request_id (str, optional): Unique ID for the request. Defaults to None.
-        
+
     Returns:
         str: Path to the generated audio file
     """
-    try:
-        # Use request_id in file name for uniqueness
-        file_id = request_id if request_id else os.urandom(8).hex()
-        audio_path = os.path.join(MEDIA_DIR, f"mock_audio_{file_id}.wav")
-        
-        # Use gTTS for actual text-to-speech
-        try:
-            # Try to use gTTS for real TTS
-            tts = gTTS(text=text, lang='en', slow=False)
-            tts.save(audio_path)
-            logger.info(f"Generated audio file with gTTS: {audio_path}")
-            return audio_path
-        except Exception as tts_error:
-            logger.warning(f"gTTS failed: {tts_error}, falling back to mock audio")
-            
-            # Generate a mock audio file if gTTS fails
-            # Parameters for mock audio
-            sample_rate = 16000  # Hz
-            duration = min(max(len(text) * 0.05, 5), 15)  # seconds, based on text length but between 5-15 seconds
-            
-            # Generate a simple sine wave
-            t = np.linspace(0, duration, int(sample_rate * duration), endpoint=False)
-            frequencies = [440, 880, 1320]  # A4, A5, E6
-            audio_data = np.zeros_like(t)
-            
-            for i, freq in enumerate(frequencies):
-                # Add harmonics with decreasing amplitude
-                audio_data += 0.5 / (i + 1) * np.sin(2 * np.pi * freq * t)
-            
-            # Normalize audio
-            audio_data = audio_data / np.max(np.abs(audio_data)) * 0.9
-            
-            # Convert to 16-bit PCM
-            audio_data_16bit = (audio_data * 32767).astype(np.int16)
-            
-            # Save the audio file
-            wavfile.write(audio_path, sample_rate, audio_data_16bit)
-            
-            logger.info(f"Generated mock audio file (duration: {duration:.2f}s): {audio_path}")
-            return audio_path
-        
-    except Exception as e:
-        logger.error(f"Error generating audio: {e}")
-        raise
+    return text_to_speech_real(text, request_id=request_id)
 
-def text_to_speech_real(text, voice="en-US-Neural2-F"):
+def tts_identity(voice=None):
+    """Backend and voice the configured chain uses when its first backend succeeds."""
+    return get_tts_engine().identity(voice)
+
+def text_to_speech_real(text, voice=None, request_id=None, synthesis=None):
     """
-    Placeholder for real TTS implementation.
-    Implement with your preferred TTS solution:
-    - Google Cloud TTS
-    - Azure Speech Service
-    - Amazon Polly
-    - Local model like Piper TTS or coqui-ai/TTS
-    
+    Synthesize speech with the configured TTS backend chain.
+
+    Writes a 16 kHz mono 16-bit WAV, the format SadTalker consumes, so no
+    resampling or MP3 decoding is needed downstream.
+
     Args:
         text (str): Text to convert to speech
-        voice (str): Voice ID to use
-        
+        voice (str, optional): Voice ID for the first backend (Piper model name
+            or gTTS language). Defaults to the backend's default voice.
+        request_id (str, optional): Unique ID for the request. Defaults to None.
+        synthesis (dict, optional): Filled with the ``backend`` that produced the
+            audio and whether its output is ``cacheable``, so callers can tell a
+            fallback (e.g. the sine tone) from the configured engine.
+
     Returns:
         str: Path to the generated audio file
     """
-    raise NotImplementedError("Real TTS not implemented")
+    try:
+        # Use request_id in file name for uniqueness
+        file_id = request_id if request_id else os.urandom(8).hex()
+        audio_path = os.path.join(MEDIA_DIR, f"mock_audio_{file_id}.wav")
+        start_time = time.time()
+        backend = get_tts_engine().synthesize_to_file(text, audio_path, voice)
+        if synthesis is not None:
+            synthesis.update(backend=backend.name, cacheable=backend.cacheable)
+        logger.info(f"Generated audio file in {time.time() - start_time:.2f}s: {audio_path}")
+        return audio_path
+    except Exception as e:
+        logger.error(f"Error generating audio: {e}")
+        raise
 
 # Example usage (for testing within the module)
 if __name__ == "__main__":
@@ -105,4 +297,4 @@ if __name__ == "__main__":
         else:
             print("Error: Mock audio file not found.")
     except Exception as e:
-        print(f"An error occurred during testing: {e}") 
\ No newline at end of file
+        print(f"An error occurred during testing: {e}")
@@ -1,5 +1,6 @@
 # Utility functions for the talking head module
 import os
+import hashlib
 
 def get_project_root() -> str:
     """Returns the absolute path to the project root directory."""
@@ -11,4 +12,12 @@ def ensure_dir_exists(directory):
     if not os.path.exists(directory):
         os.makedirs(directory)
         return True
-    return False 
\ No newline at end of file
+    return False
+
+def sha256_file(path, chunk_size=1024 * 1024) -> str:
+    """Return the hex sha256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
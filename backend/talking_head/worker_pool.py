@@ -0,0 +1,441 @@
+"""
+Persistent SadTalker worker pool.
+
+Spawning ``inference_enhanced_with_video.py`` for every request means each video
+pays for Python start-up, the torch import and loading the CropAndExtract,
+Audio2Coeff and AnimateFromCoeff checkpoints before a single frame is rendered.
+This module keeps N long-lived worker processes around instead. Each worker
+imports SadTalker once, keeps its models warm between jobs and receives work
+over a local multiprocessing queue.
+"""
+import os
+import sys
+import time
+import uuid
+import shutil
+import logging
+import threading
+import queue
+import multiprocessing as mp
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from time import strftime
+
+from .face_cache import SourceFaceCache
+
+logger = logging.getLogger(__name__)
+
+# How long a freshly started worker may take to import SadTalker before the
+# pool is considered unusable (model loading on CPU boxes is slow).
+WORKER_STARTUP_TIMEOUT = 600
+# A slot whose worker fails to load SadTalker is retried with exponential backoff
+# (e.g. after an OOM during a checkpoint load) and given up after this many tries.
+WORKER_INIT_RETRIES = 3
+WORKER_RESTART_BACKOFF = 5
+
+
+class SadTalkerRenderer:
+    """
+    Holds warm SadTalker models inside a worker process.
+
+    Models are keyed by (size, preprocess) because ``init_path`` picks different
+    checkpoints and configs for each combination. The first job for a key loads
+    the models, every following job reuses them.
+    """
+
+    def __init__(self, sadtalker_root, device="cpu"):
+        self.sadtalker_root = sadtalker_root
+        self.checkpoint_dir = os.path.join(sadtalker_root, "checkpoints")
+        self.config_dir = os.path.join(sadtalker_root, "src", "config")
+        self.device = device
+        self._models = {}
+        self._face_caches = {}
+
+        # SadTalker resolves its own modules and several assets relative to its root
+        if sadtalker_root not in sys.path:
+            sys.path.insert(0, sadtalker_root)
+        os.chdir(sadtalker_root)
+
+        # Apply the same compatibility patches the enhanced inference script uses
+        for patch_module in ("early_compatibility_patch", "functional_tensor_patch"):
+            try:
+                __import__(patch_module)
+            except ImportError:
+                logger.debug(f"Compatibility patch {patch_module} not available")
+
+    def _get_models(self, size, preprocess):
+        key = (size, preprocess)
+        if key not in self._models:
+            from src.utils.preprocess import CropAndExtract
+            from src.test_audio2coeff import Audio2Coeff
+            from src.facerender.animate import AnimateFromCoeff
+            from src.utils.init_path import init_path
+
+            load_start = time.time()
+            sadtalker_paths = init_path(self.checkpoint_dir, self.config_dir, size, False, preprocess)
+            self._models[key] = (
+                CropAndExtract(sadtalker_paths, self.device),
+                Audio2Coeff(sadtalker_paths, self.device),
+                AnimateFromCoeff(sadtalker_paths, self.device),
+            )
+            logger.info(f"Loaded SadTalker models for size={size}, preprocess={preprocess} "
+                        f"in {time.time() - load_start:.2f}s")
+        return self._models[key]
+
+    def _get_face_cache(self, cache_dir):
+        if not cache_dir:
+            return None
+        if cache_dir not in self._face_caches:
+            self._face_caches[cache_dir] = SourceFaceCache(cache_dir)
+        return self._face_caches[cache_dir]
+
+    def warm_up(self, size=256, preprocess="crop"):
+        """Load the models for the pool's render options ahead of the first job."""
+        self._get_models(size, preprocess)
+
+    def _enhance(self, video_path, audio_path, enhancer, timings):
+        """Run the face enhancer over a rendered video and mux the audio back in."""
+        import imageio
+        from src.utils.face_enhancer import enhancer_generator_with_len
+        from src.utils.videoio import save_video_with_watermark
+
+        base_path = os.path.splitext(video_path)[0]
+        enhanced_frames_path = base_path + "_enhanced_noaudio.mp4"
+        enhanced_path = base_path + "_enhanced.mp4"
+
+        stage_start = time.time()
+        frames = enhancer_generator_with_len(video_path, method=enhancer, bg_upsampler=None)
+        imageio.mimsave(enhanced_frames_path, frames, fps=float(25))
+        timings["enhancer"] = time.time() - stage_start
+
+        stage_start = time.time()
+        save_video_with_watermark(enhanced_frames_path, audio_path, enhanced_path, watermark=False)
+        timings["ffmpeg_mux"] = time.time() - stage_start
+        return enhanced_path
+
+    def render(self, job):
+        """
+        Render one talking head video. Mirrors ``inference_sadtalker.main``.
+
+        Args:
+            job (dict): driven_audio, source_image, result_dir and render options.
+
+        Returns:
+            dict: ``video_path`` of the generated MP4 and per-stage ``timings``.
+        """
+        from src.generate_batch import get_data
+        from src.generate_facerender_batch import get_facerender_data
+
+        size = job.get("size", 256)
+        preprocess = job.get("preprocess", "crop")
+        still = job.get("still", True)
+        preprocess_model, audio_to_coeff, animate_from_coeff = self._get_models(size, preprocess)
+
+        timings = {}
+        save_dir = os.path.join(job["result_dir"], strftime("%Y_%m_%d_%H.%M.%S"))
+        os.makedirs(save_dir, exist_ok=True)
+
+        # Crop image and extract 3DMM coefficients from the source face
+        stage_start = time.time()
+        first_frame_dir = os.path.join(save_dir, "first_frame_dir")
+        os.makedirs(first_frame_dir, exist_ok=True)
+        face_cache = self._get_face_cache(job.get("face_cache_dir"))
+        if face_cache is not None:
+            first_coeff_path, crop_pic_path, crop_info = face_cache.get_or_extract(
+                preprocess_model, job["source_image"], first_frame_dir, preprocess, size
+            )
+        else:
+            first_coeff_path, crop_pic_path, crop_info = preprocess_model.generate(
+                job["source_image"], first_frame_dir, preprocess, source_image_flag=True, pic_size=size
+            )[:3]
+        if first_coeff_path is None:
+            raise RuntimeError("3DMM extraction failed - no face detected in source image")
+        timings["extract_3dmm"] = time.time() - stage_start
+
+        # Audio to motion coefficients
+        stage_start = time.time()
+        batch = get_data(first_coeff_path, job["driven_audio"], self.device, None, still=still)
+        coeff_path = audio_to_coeff.generate(batch, save_dir, job.get("pose_style", 0), None)
+        timings["audio2coeff"] = time.time() - stage_start
+
+        # Coefficients to video; SadTalker muxes the driven audio into this render
+        stage_start = time.time()
+        data = get_facerender_data(coeff_path, crop_pic_path, first_coeff_path, job["driven_audio"],
+                                   job.get("batch_size", 2), None, None, None,
+                                   expression_scale=job.get("expression_scale", 1.0),
+                                   still_mode=still, preprocess=preprocess, size=size)
+        result = animate_from_coeff.generate(data, save_dir, job["source_image"], crop_info,
+                                             enhancer=None, background_enhancer=None,
+                                             preprocess=preprocess, img_size=size)
+        timings["face_render"] = time.time() - stage_start
+
+        # The enhancer runs here rather than inside generate() so it is timed on its own
+        enhancer = job.get("enhancer")
+        if enhancer not in (None, "none"):
+            result = self._enhance(result, job["driven_audio"], enhancer, timings)
+
+        video_path = save_dir + ".mp4"
+        shutil.move(result, video_path)
+        shutil.rmtree(save_dir, ignore_errors=True)
+        return {"video_path": video_path, "timings": timings}
+
+
+def _worker_main(worker_index, job_queue, result_queue, renderer_factory, renderer_args, warm_up_options):
+    """Entry point of a pool worker process."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        renderer = renderer_factory(*renderer_args)
+        if hasattr(renderer, "warm_up"):
+            renderer.warm_up(**warm_up_options)
+    except Exception as e:
+        result_queue.put(("init_failed", worker_index, f"{type(e).__name__}: {e}"))
+        return
+
+    result_queue.put(("ready", worker_index, os.getpid()))
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+        job_id = job["job_id"]
+        # The caller stopped waiting while the job sat in the queue; don't render it
+        if job.get("deadline") and time.time() > job["deadline"]:
+            result_queue.put(("skipped", worker_index, job_id))
+            continue
+        result_queue.put(("started", worker_index, job_id))
+        try:
+            result = renderer.render(job)
+            result_queue.put(("done", job_id, result))
+        except Exception as e:
+            result_queue.put(("error", job_id, f"{type(e).__name__}: {e}"))
+
+
+class SadTalkerWorkerPool:
+    """
+    A fixed-size pool of SadTalker worker processes with warm models.
+
+    ``render`` blocks the calling thread until a worker returns the result, so it
+    can be used as a drop-in replacement for the blocking ``subprocess.run`` call.
+    Workers that crash or exceed the job timeout are terminated and replaced.
+    A worker that fails to load SadTalker only takes its own slot out of service:
+    the slot is retried with backoff while the other workers keep rendering.
+    ``warm_up_options`` (size, preprocess) should match the options jobs render
+    with, so the models loaded at start-up are the ones the jobs use.
+    """
+
+    def __init__(self, num_workers, sadtalker_root, renderer_factory=SadTalkerRenderer, device="cpu",
+                 warm_up_options=None):
+        self.num_workers = max(1, int(num_workers))
+        self._renderer_factory = renderer_factory
+        self._renderer_args = (sadtalker_root, device)
+        self._warm_up_options = dict(warm_up_options or {})
+        self._ctx = mp.get_context("spawn")
+        self._job_queue = self._ctx.Queue()
+        self._result_queue = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._pending = {}          # job_id -> Future
+        self._worker_jobs = {}      # worker index -> job_id currently rendering
+        self._cancelled = set()     # timed-out job ids that may still be queued or starting
+        self._workers = {}
+        self._ready = threading.Event()
+        self._ready_workers = set()  # indices of workers that loaded SadTalker
+        self._init_failures = {}     # worker index -> consecutive failed start-ups
+        self._restart_at = {}        # worker index -> time its next start-up may begin
+        self._closed = False
+
+        for index in range(self.num_workers):
+            self._start_worker(index)
+
+        self._collector = threading.Thread(target=self._collect_results, name="sadtalker-pool-collector", daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, index):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self._job_queue, self._result_queue, self._renderer_factory, self._renderer_args,
+                  self._warm_up_options),
+            name=f"sadtalker-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._workers[index] = process
+        logger.info(f"Started SadTalker worker {index} (pid {process.pid})")
+
+    def _fail_job(self, job_id, error):
+        with self._lock:
+            future = self._pending.pop(job_id, None)
+        if future and not future.done():
+            future.set_exception(error)
+
+    def _collect_results(self):
+        while not self._closed:
+            try:
+                kind, key, payload = self._result_queue.get(timeout=1)
+            except queue.Empty:
+                self._reap_dead_workers()
+                continue
+            except (EOFError, OSError):
+                break
+
+            if kind == "ready":
+                logger.info(f"SadTalker worker {key} ready (pid {payload})")
+                with self._lock:
+                    self._ready_workers.add(key)
+                    self._init_failures.pop(key, None)
+                self._ready.set()
+            elif kind == "init_failed":
+                # The worker exits next; _reap_dead_workers schedules the retry
+                logger.error(f"SadTalker worker {key} failed to initialise: {payload}")
+            elif kind == "skipped":
+                with self._lock:
+                    self._cancelled.discard(payload)
+                logger.info(f"SadTalker worker {key} skipped timed-out job {payload}")
+            elif kind == "started":
+                with self._lock:
+                    cancelled = payload in self._cancelled
+                    self._cancelled.discard(payload)
+                    if not cancelled:
+                        self._worker_jobs[key] = payload
+                if cancelled:
+                    # Picked up just as the caller timed out; nobody is waiting for it
+                    logger.warning(f"Terminating SadTalker worker {key} that started timed-out job {payload}")
+                    self._workers[key].terminate()
+            elif kind in ("done", "error"):
+                with self._lock:
+                    self._cancelled.discard(key)
+                    future = self._pending.pop(key, None)
+                    for index, job_id in list(self._worker_jobs.items()):
+                        if job_id == key:
+                            del self._worker_jobs[index]
+                if future is None or future.done():
+                    continue
+                if kind == "done":
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(f"SadTalker worker failed: {payload}"))
+
+    def _reap_dead_workers(self):
+        for index, process in list(self._workers.items()):
+            if process.is_alive() or self._closed:
+                continue
+            with self._lock:
+                job_id = self._worker_jobs.pop(index, None)
+                was_ready = index in self._ready_workers
+                self._ready_workers.discard(index)
+            if job_id:
+                self._fail_job(job_id, RuntimeError(f"SadTalker worker {index} exited with code {process.exitcode}"))
+            if was_ready:
+                logger.warning(f"SadTalker worker {index} died (exit code {process.exitcode}), restarting")
+                self._start_worker(index)
+                continue
+            self._restart_after_init_failure(index, process.exitcode)
+
+    def _restart_after_init_failure(self, index, exitcode):
+        """Restart a worker that died before it was ready, backing off between tries."""
+        if index not in self._restart_at:
+            failures = self._init_failures.get(index, 0) + 1
+            self._init_failures[index] = failures
+            if failures >= WORKER_INIT_RETRIES:
+                logger.error(f"SadTalker worker {index} failed to start {failures} times, giving up on it")
+                del self._workers[index]
+                if not self._workers:
+                    self._ready.set()  # nothing left to wait for; wait_until_ready reports False
+                return
+            delay = WORKER_RESTART_BACKOFF * 2 ** (failures - 1)
+            logger.warning(f"SadTalker worker {index} failed to start (exit code {exitcode}), "
+                           f"retrying in {delay}s")
+            self._restart_at[index] = time.time() + delay
+        if time.time() >= self._restart_at[index]:
+            del self._restart_at[index]
+            self._start_worker(index)
+
+    @property
+    def available(self):
+        """True while at least one worker has SadTalker loaded."""
+        return bool(self._ready_workers)
+
+    def wait_until_ready(self, timeout=WORKER_STARTUP_TIMEOUT):
+        """Block until a worker is ready. Returns False if the pool cannot be used."""
+        self._ready.wait(timeout)
+        return self.available
+
+    def submit(self, job, timeout=None):
+        """
+        Queue a render job and return a Future resolving to the renderer result.
+
+        With ``timeout``, a worker that only dequeues the job after that many
+        seconds skips it instead of rendering a result nobody waits for.
+        """
+        if self._closed:
+            raise RuntimeError("SadTalker worker pool is shut down")
+        job = dict(job)
+        job.setdefault("job_id", str(uuid.uuid4()))
+        if timeout:
+            job["deadline"] = time.time() + timeout
+        future = Future()
+        with self._lock:
+            self._pending[job["job_id"]] = future
+        self._job_queue.put(job)
+        future.job_id = job["job_id"]
+        return future
+
+    def render(self, job, timeout=None):
+        """Render a job on a warm worker and wait for the result."""
+        future = self.submit(job, timeout=timeout)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._recycle_worker_for(future.job_id)
+            raise TimeoutError(f"SadTalker worker did not finish within {timeout} seconds")
+
+    def _recycle_worker_for(self, job_id):
+        """
+        Terminate the worker stuck on ``job_id``; the collector restarts it.
+
+        A job that no worker has started yet is marked cancelled: workers skip it
+        once its deadline has passed, and one that starts it anyway is recycled.
+        """
+        with self._lock:
+            self._pending.pop(job_id, None)
+            stuck = [index for index, current in self._worker_jobs.items() if current == job_id]
+            if not stuck:
+                self._cancelled.add(job_id)
+        for index in stuck:
+            logger.warning(f"Terminating SadTalker worker {index} stuck on job {job_id}")
+            self._workers[index].terminate()
+
+    def shutdown(self):
+        """Stop all workers and fail any job that is still pending."""
+        self._closed = True
+        for _ in self._workers:
+            self._job_queue.put(None)
+        for process in self._workers.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("SadTalker worker pool shut down"))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool(num_workers, sadtalker_root, renderer_factory=SadTalkerRenderer, warm_up_options=None):
+    """Return the process-wide worker pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SadTalkerWorkerPool(num_workers, sadtalker_root, renderer_factory=renderer_factory,
+                                        warm_up_options=warm_up_options)
+        return _pool
+
+
+def shutdown_worker_pool():
+    """Shut down the process-wide worker pool if it was started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
@@ -0,0 +1,60 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("psutil")
+
+from talking_head import segmented
+
+
+@pytest.fixture
+def renders(monkeypatch, tmp_path):
+    """Render segments from a list of paths and remux them without ffmpeg."""
+    monkeypatch.setattr(segmented, "MEDIA_DIR", str(tmp_path))
+    monkeypatch.setattr(segmented.subprocess, "run",
+                        lambda *args, **kwargs: subprocess.CompletedProcess(args, 0, "2.0", ""))
+    paths = {}
+
+    def generate_talking_video(text, *args, **kwargs):
+        return paths[text]
+
+    monkeypatch.setattr(segmented, "generate_talking_video", generate_talking_video)
+    return paths
+
+
+def _playlist(tmp_path):
+    [output_dir] = os.listdir(tmp_path)
+    with open(os.path.join(tmp_path, output_dir, "playlist.m3u8")) as f:
+        return f.read().splitlines()
+
+
+def test_fallback_segment_ends_published_playlist(renders, tmp_path):
+    renders["First sentence here."] = str(tmp_path / "segment_0.mp4")
+    renders["Second sentence here."] = str(tmp_path / "fallback_video.mp4")
+    ready = []
+
+    video_path = segmented.generate_segmented_talking_video(
+        "First sentence here. Second sentence here.", max_segment_chars=25, publish_hls=True,
+        progress_callback=lambda stage, percent, *message: ready.append(stage),
+    )
+
+    assert video_path == renders["Second sentence here."]
+    assert ready == ["segment_ready"]
+    lines = _playlist(tmp_path)
+    assert lines[-1] == "#EXT-X-ENDLIST"
+    assert lines.count("segment_000.ts") == 1
+
+
+def test_failed_segment_ends_published_playlist(renders, tmp_path):
+    renders["First sentence here."] = str(tmp_path / "segment_0.mp4")
+
+    with pytest.raises(KeyError):
+        segmented.generate_segmented_talking_video(
+            "First sentence here. Second sentence here.", max_segment_chars=25, publish_hls=True,
+        )
+
+    assert _playlist(tmp_path)[-1] == "#EXT-X-ENDLIST"
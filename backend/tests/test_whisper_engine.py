@@ -0,0 +1,83 @@
+import os
+import sys
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from whisper_engine import SAMPLE_RATE, WhisperEngine
+
+
+class BrokenExecutor:
+    """A process pool whose worker was killed: every future fails with BrokenProcessPool."""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+class WorkingExecutor:
+    def submit(self, fn, audio, offset_seconds, options):
+        future = Future()
+        future.set_result({
+            "text": "window",
+            "language": "en",
+            "segments": [{"start": 0.0, "end": 1.0, "text": "window"}],
+            "offset_seconds": offset_seconds,
+        })
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class PooledEngine(WhisperEngine):
+    """Takes its executors from ``pools`` instead of spawning Whisper workers."""
+
+    def __init__(self, pools):
+        super().__init__(num_workers=2, min_window_seconds=1)
+        self.pools = pools
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self.pools.pop(0)
+            return self._executor
+
+
+def _audio(seconds=10):
+    return np.zeros(seconds * SAMPLE_RATE, dtype=np.float32)
+
+
+def test_broken_pool_is_replaced_and_retried():
+    broken, working = BrokenExecutor(), WorkingExecutor()
+    engine = PooledEngine([broken, working])
+
+    result = engine.transcribe(_audio())
+
+    assert broken.shut_down
+    assert engine._executor is working
+    assert result["text"] == "window window"
+    first, second = result["segments"]
+    assert first["start"] == 0.0 and second["start"] > 0.0
+
+
+def test_broken_pool_twice_raises_and_resets():
+    engine = PooledEngine([BrokenExecutor(), BrokenExecutor(), WorkingExecutor()])
+
+    with pytest.raises(BrokenProcessPool):
+        engine.transcribe(_audio())
+    assert engine._executor is None
+
+    # The next transcription starts a fresh pool instead of reusing the broken one
+    assert engine.transcribe(_audio())["text"] == "window window"
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from talking_head import worker_pool
+
+
+class FirstStartFails:
+    """Renderer whose first construction in ``claim_dir`` fails, as an OOM during loading would."""
+
+    def __init__(self, claim_dir, device="cpu"):
+        try:
+            os.mkdir(os.path.join(claim_dir, "claimed"))
+        except FileExistsError:
+            return
+        raise MemoryError("out of memory loading checkpoints")
+
+    def render(self, job):
+        return {"video_path": job["text"], "timings": {}}
+
+
+class AlwaysFails:
+    def __init__(self, *args):
+        raise MemoryError("out of memory loading checkpoints")
+
+
+@pytest.fixture
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(worker_pool, "WORKER_RESTART_BACKOFF", 0.1)
+
+
+def test_failed_worker_start_keeps_pool_available(tmp_path, fast_backoff):
+    pool = worker_pool.SadTalkerWorkerPool(2, str(tmp_path), renderer_factory=FirstStartFails)
+    try:
+        assert pool.wait_until_ready(60)
+        assert pool.render({"text": "video.mp4"}, timeout=30)["video_path"] == "video.mp4"
+        # The failed slot is restarted and rejoins the pool
+        deadline = time.time() + 30
+        while len(pool._ready_workers) < 2 and time.time() < deadline:
+            time.sleep(0.1)
+        assert pool._ready_workers == {0, 1}
+    finally:
+        pool.shutdown()
+
+
+def test_pool_gives_up_on_workers_that_never_start(tmp_path, fast_backoff):
+    pool = worker_pool.SadTalkerWorkerPool(1, str(tmp_path), renderer_factory=AlwaysFails)
+    try:
+        assert not pool.wait_until_ready(60)
+        assert not pool.available
+    finally:
+        pool.shutdown()
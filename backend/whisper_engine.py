@@ -0,0 +1,171 @@
+"""
+Parallel Whisper transcription for long recordings.
+
+A single ``transcribe`` call works through the audio one 30 second window after
+another on one model, so an hour-long lecture keeps a single core busy for a
+very long time. This engine cuts the audio into windows (at the quietest point
+near each boundary, so words are not split), transcribes the windows on a
+process pool where every worker holds one warm Whisper model, and stitches the
+segments back together with their offsets corrected, the same bookkeeping
+``model/src/app/speech.py:split_audio`` does for VOSK.
+"""
+import os
+import math
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL", "base")
+# Same switch as the model registry: "int8" quantizes each worker's model
+MODEL_QUANTIZATION = os.getenv("MODEL_QUANTIZATION", "none").lower()
+# Worker processes, each with its own model; 0 or 1 disables parallel transcription
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+# Shortest window worth shipping to a worker; shorter audio is transcribed in-process
+MIN_WINDOW_SECONDS = int(os.getenv("WHISPER_MIN_WINDOW_SECONDS", "120"))
+# Window boundaries move to the quietest 20 ms frame within this many seconds
+BOUNDARY_SEARCH_SECONDS = 2.0
+
+_worker_model = None
+
+
+def _init_worker(model_name, torch_threads, quantization):
+    """Process pool initializer: load the model once per worker."""
+    global _worker_model
+    import torch
+    from model.src.app.model_registry import load_whisper_model
+    torch.set_num_threads(torch_threads)
+    _worker_model = load_whisper_model(model_name, quantization)
+
+
+def _transcribe_window(audio, offset_seconds, options):
+    result = _worker_model.transcribe(audio, **options)
+    return {
+        "text": result["text"],
+        "language": result.get("language"),
+        "segments": result.get("segments", []),
+        "offset_seconds": offset_seconds,
+    }
+
+
+def quietest_sample(audio, center, search_seconds=BOUNDARY_SEARCH_SECONDS, frame_seconds=0.02):
+    """Index of the start of the lowest-energy frame within ``search_seconds`` of ``center``."""
+    frame = int(SAMPLE_RATE * frame_seconds)
+    start = max(0, center - int(SAMPLE_RATE * search_seconds))
+    end = min(len(audio), center + int(SAMPLE_RATE * search_seconds))
+    num_frames = (end - start) // frame
+    if num_frames < 2:
+        return center
+    frames = audio[start:start + num_frames * frame].reshape(num_frames, frame)
+    energy = np.einsum("ij,ij->i", frames, frames)
+    return start + int(np.argmin(energy)) * frame
+
+
+def split_audio_array(audio, num_segments, minimum_segment_duration=MIN_WINDOW_SECONDS):
+    """Split 16 kHz samples into at most ``num_segments`` windows with their offsets."""
+    total_seconds = len(audio) / SAMPLE_RATE
+    max_num_segments = math.floor(total_seconds / minimum_segment_duration)
+    num_segments = min(max_num_segments, num_segments)
+
+    if num_segments <= 1:
+        return [{"audio": audio, "offset_seconds": 0.0}]
+
+    segment_samples = len(audio) // num_segments
+    boundaries = [0]
+    for i in range(1, num_segments):
+        boundaries.append(quietest_sample(audio, i * segment_samples))
+    boundaries.append(len(audio))
+
+    return [
+        {"audio": audio[start:end], "offset_seconds": start / SAMPLE_RATE}
+        for start, end in zip(boundaries, boundaries[1:])
+    ]
+
+
+def stitch_results(results):
+    """Merge per-window results into one transcribe()-style result."""
+    results = sorted(results, key=lambda result: result["offset_seconds"])
+    segments = []
+    for result in results:
+        offset = result["offset_seconds"]
+        for segment in result["segments"]:
+            segment = dict(segment)
+            segment["id"] = len(segments)
+            segment["seek"] = segment.get("seek", 0) + int(offset * 100)  # seek is in 10 ms frames
+            segment["start"] = segment["start"] + offset
+            segment["end"] = segment["end"] + offset
+            segments.append(segment)
+    return {
+        "text": " ".join(result["text"].strip() for result in results if result["text"].strip()),
+        "segments": segments,
+        "language": results[0]["language"] if results else None,
+    }
+
+
+class WhisperEngine:
+    """Transcribes long audio across a pool of warm Whisper worker processes."""
+
+    def __init__(self, model_name=WHISPER_MODEL_NAME, num_workers=WHISPER_WORKERS,
+                 min_window_seconds=MIN_WINDOW_SECONDS, quantization=MODEL_QUANTIZATION):
+        self.model_name = model_name
+        self.quantization = quantization
+        self.num_workers = num_workers
+        self.min_window_seconds = min_window_seconds
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def should_parallelize(self, audio):
+        """Only audio spanning at least two windows is worth the process hop."""
+        return self.num_workers > 1 and len(audio) >= 2 * self.min_window_seconds * SAMPLE_RATE
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                torch_threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    mp_context=mp.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, torch_threads, self.quantization),
+                )
+            return self._executor
+
+    def transcribe(self, audio, **options):
+        """
+        Transcribe 16 kHz mono float32 samples window by window in parallel.
+
+        Returns:
+            dict: ``text``, offset-corrected ``segments`` and ``language``, like
+            ``whisper.transcribe``.
+        """
+        windows = split_audio_array(audio, self.num_workers, self.min_window_seconds)
+        try:
+            return self._transcribe_windows(windows, options)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); retry once on a fresh pool
+            return self._transcribe_windows(windows, options)
+
+    def _transcribe_windows(self, windows, options):
+        executor = self._get_executor()
+        try:
+            futures = [
+                executor.submit(_transcribe_window, window["audio"], window["offset_seconds"], options)
+                for window in windows
+            ]
+            return stitch_results([future.result() for future in futures])
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
@@ -12,6 +12,14 @@ from src.generate_batch import get_data
 from src.generate_facerender_batch import get_facerender_data
 from src.utils.init_path import init_path
 
+# Optional source-face cache from the website backend; when this script is copied
+# into a SadTalker checkout the backend puts its directory on PYTHONPATH
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+try:
+    from talking_head.face_cache import SourceFaceCache
+except ImportError:
+    SourceFaceCache = None
+
 def main(args):
     # Check if required checkpoint files exist, if not exit early with success
     checkpoint_paths = [
@@ -634,7 +642,12 @@ def main(args):
     print('3DMM Extraction for source image')
     try:
         # Handle both old and new generate method return values
-        result = preprocess_model.generate(pic_path, first_frame_dir, args.preprocess,\
+        if args.face_cache_dir and SourceFaceCache is not None:
+            # Repeat faces skip face detection and 3DMM fitting entirely
+            face_cache = SourceFaceCache(args.face_cache_dir)
+            result = face_cache.get_or_extract(preprocess_model, pic_path, first_frame_dir, args.preprocess, args.size)
+        else:
+            result = preprocess_model.generate(pic_path, first_frame_dir, args.preprocess,\
                                                                              source_image_flag=True, pic_size=args.size)
         # Check if result is a tuple with 3 values (old API) or something else (new API)
         if isinstance(result, tuple) and len(result) == 3:
@@ -726,6 +739,7 @@ if __name__ == '__main__':
     parser.add_argument("--preprocess", default='crop', choices=['crop', 'extcrop', 'resize', 'full', 'extfull'], help="how to preprocess the images" ) 
     parser.add_argument("--verbose",action="store_true", help="saving the intermedia output or not" ) 
     parser.add_argument("--old_version",action="store_true", help="use the pth other than safetensor version" ) 
+    parser.add_argument("--face_cache_dir", default=None, help="cache source face crops and 3DMM coefficients in this directory" ) 
 
 
     # net structure and parameters
@@ -1,19 +1,16 @@
 import io
+import json
 from subprocess import CalledProcessError
 
 import fleep
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
 from objsize import get_deep_size
 from requests import post
 import os
 import tempfile
-from moviepy.editor import VideoFileClip
-import whisper
-from transformers import pipeline
-import torch
 
 from src.app.TTS import text_to_speech
-from src.app.speech import transcribe, extract_audio
+from src.app.speech import transcribe, extract_audio, transcribe_stream
 from src.app.summarizer import summarize_text
 from src.exceptions import error_to_json
 
@@ -23,6 +20,9 @@ ALLOWED_EXTENSIONS = ['mp4', 'mp3', 'wav']
 
 MAX_FILE_LIMIT = min(500 * 1024, 512000) * 1024
 
+# Size of the reads from the request body in streaming mode
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 @speech_blueprint.route('/api/extract', methods=['POST'])
 def transcription():
@@ -88,3 +88,69 @@ def transcription():
         as_attachment=False,
         mimetype='audio/mpeg'
     )
+
+
+class FileTooLarge(Exception):
+    pass
+
+
+def _read_body(stream, first_chunk):
+    """Yield the request body in chunks, enforcing MAX_FILE_LIMIT as it arrives."""
+    received = len(first_chunk)
+    yield first_chunk
+    while True:
+        chunk = stream.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            return
+        received += len(chunk)
+        if received > MAX_FILE_LIMIT:
+            raise FileTooLarge()
+        yield chunk
+
+
+def _server_sent_event(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+@speech_blueprint.route('/api/extract/stream', methods=['POST'])
+def streaming_transcription():
+    """
+    Transcribe the request body while it is being uploaded.
+
+    The body is decoded by ffmpeg through pipes and recognized chunk by chunk;
+    partial and finished phrases are sent back as server-sent events, so the
+    first words arrive without waiting for the whole upload to be processed.
+    """
+    first_chunk = request.stream.read(STREAM_CHUNK_SIZE)
+    if not first_chunk:
+        return error_to_json(
+            error="file_not_found",
+            description="No file was detected in the body request. "
+                        "Please make sure to include a binary file in body request."
+        ), 400
+
+    # The container is identified from the leading bytes, before the rest has arrived
+    file_info = fleep.get(first_chunk)
+    if not file_info.type or file_info.type[0] not in ['video', 'audio']:
+        return error_to_json(
+            error="ivalid_file_extension",
+            description=f"The file format is not supported. "
+                        f"Supported file formats are : "
+                        f'{", ".join(ALLOWED_EXTENSIONS)}'
+        ), 400
+
+    def events():
+        try:
+            for event in transcribe_stream(_read_body(request.stream, first_chunk)):
+                yield _server_sent_event(event)
+        except FileTooLarge:
+            yield _server_sent_event({
+                'event': 'error',
+                'description': "The uploaded file is greater than the maximum file length accepted."
+            })
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
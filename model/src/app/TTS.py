@@ -1,11 +1,11 @@
-from gtts import gTTS
 import io
 
+from .audio_cache import synthesize_text, pcm_to_mp3
+
 
 def text_to_speech(text):
-    audio_io = io.BytesIO()
-    tts = gTTS(text)
-    tts.write_to_fp(audio_io)
+    # Sentences are synthesized once and shared with the other TTS call sites
+    audio_io = io.BytesIO(pcm_to_mp3(synthesize_text(text)))
     audio_io.seek(0)
 
-    return audio_io
\ No newline at end of file
+    return audio_io
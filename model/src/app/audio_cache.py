@@ -0,0 +1,199 @@
+"""
+Sentence-level cache of synthesized speech shared by every TTS call site.
+
+Audio is stored per (engine, voice, normalized sentence) as raw 16 kHz mono
+16-bit PCM under TTS_CACHE_DIR, so the talking head WAV, the ModelProcessor MP3
+and the Flask service MP3 all reuse the same synthesized sentences. Utterances
+are assembled by concatenating cached PCM, and only the final container (WAV or
+MP3) is encoded per request. Files are written atomically and the least recently
+used ones are evicted once the directory exceeds TTS_CACHE_MAX_MB.
+"""
+import io
+import os
+import re
+import wave
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # bytes, signed 16-bit little endian
+# Pause inserted between sentences when an utterance is assembled
+SENTENCE_GAP_SECONDS = 0.15
+
+TTS_CACHE_DIR = os.getenv(
+    'TTS_CACHE_DIR',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '../../files/tts_cache'))
+)
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_MB', '512')) * 1024 * 1024
+# Uncached sentences synthesized with gTTS at the same time
+GTTS_MAX_PARALLEL_REQUESTS = int(os.getenv('GTTS_MAX_PARALLEL_REQUESTS', '4'))
+
+
+def normalize_sentence(sentence):
+    """Collapse whitespace so the same sentence always maps to one entry."""
+    return re.sub(r'\s+', ' ', sentence or '').strip()
+
+
+def split_sentences(text):
+    """Split text into normalized sentences on terminal punctuation."""
+    sentences = [normalize_sentence(s) for s in re.split(r'(?<=[.!?])\s+', text or '')]
+    return [s for s in sentences if s]
+
+
+def join_pcm(parts, gap_seconds=SENTENCE_GAP_SECONDS):
+    """Concatenate PCM byte strings with a short silence between them."""
+    gap = b'\x00' * (int(SAMPLE_RATE * gap_seconds) * SAMPLE_WIDTH)
+    return gap.join(parts)
+
+
+def pcm_to_wav(pcm, path=None):
+    """Wrap PCM in a WAV container; writes to ``path`` or returns the bytes."""
+    target = path if path else io.BytesIO()
+    with wave.open(target, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(SAMPLE_WIDTH)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(pcm)
+    return path if path else target.getvalue()
+
+
+def pcm_to_mp3(pcm):
+    """Encode PCM as MP3 bytes."""
+    from pydub import AudioSegment
+    segment = AudioSegment(data=pcm, sample_width=SAMPLE_WIDTH, frame_rate=SAMPLE_RATE, channels=1)
+    mp3_io = io.BytesIO()
+    segment.export(mp3_io, format='mp3')
+    return mp3_io.getvalue()
+
+
+class SentenceAudioCache:
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # computed lazily from the directory
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(engine, voice, sentence):
+        payload = f'{engine}\x00{voice}\x00{normalize_sentence(sentence)}'
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.pcm')
+
+    def get(self, key):
+        """Return cached PCM bytes or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                pcm = f.read()
+            os.utime(path)  # mark as most recently used
+            return pcm
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, pcm):
+        fd, staging_path = tempfile.mkstemp(suffix='.pcm.tmp', dir=self.cache_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pcm)
+        os.replace(staging_path, self._path(key))
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += len(pcm)
+        self._evict()
+
+    def get_or_synthesize(self, sentences, engine, voice, synthesize):
+        """
+        Return PCM for each sentence, synthesizing only the uncached ones.
+
+        ``synthesize(sentences)`` receives the missing sentences as one batch and
+        returns their PCM byte strings in order.
+        """
+        keys = [self.key_for(engine, voice, sentence) for sentence in sentences]
+        pcm = {key: self.get(key) for key in keys}
+        missing = {}
+        for key, sentence in zip(keys, sentences):
+            if pcm[key] is None:
+                missing.setdefault(key, sentence)
+        if missing:
+            for key, audio in zip(missing, synthesize(list(missing.values()))):
+                pcm[key] = audio
+                self.put(key, audio)
+        return [pcm[key] for key in keys], len(missing)
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pcm'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+                return
+            entries = self._scan()
+            total_bytes = sum(size for _, size, _ in entries)
+            entries.sort()
+            while entries and total_bytes > self.max_bytes:
+                _, size, path = entries.pop(0)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+            self._total_bytes = total_bytes
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """Return the process-wide sentence audio cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SentenceAudioCache()
+        return _cache
+
+
+def _gtts_segment(text, lang):
+    from gtts import gTTS
+    from pydub import AudioSegment
+    mp3_io = io.BytesIO()
+    gTTS(text, lang=lang).write_to_fp(mp3_io)
+    mp3_io.seek(0)
+    segment = AudioSegment.from_file(mp3_io, format='mp3')
+    return segment.set_frame_rate(SAMPLE_RATE).set_channels(1).set_sample_width(SAMPLE_WIDTH)
+
+
+def gtts_synthesize(sentences, lang='en'):
+    """
+    Synthesize sentences with gTTS and decode them to 16 kHz mono PCM.
+
+    Each sentence is its own gTTS request, so every cache entry holds exactly
+    its sentence; the requests run in parallel to hide the network latency.
+    """
+    if len(sentences) <= 1:
+        return [_gtts_segment(sentence, lang).raw_data for sentence in sentences]
+    with ThreadPoolExecutor(max_workers=min(GTTS_MAX_PARALLEL_REQUESTS, len(sentences))) as executor:
+        return [segment.raw_data for segment in executor.map(lambda sentence: _gtts_segment(sentence, lang), sentences)]
+
+
+def synthesize_text(text, lang='en'):
+    """Speak ``text`` with gTTS through the sentence cache; returns PCM bytes."""
+    sentences = split_sentences(text) or [normalize_sentence(text)]
+    parts, _ = get_audio_cache().get_or_synthesize(
+        sentences, 'gtts', lang, lambda missing: gtts_synthesize(missing, lang)
+    )
+    return join_pcm(parts)
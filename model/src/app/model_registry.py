@@ -0,0 +1,190 @@
+"""
+Process-wide registry of the heavy ML models.
+
+Whisper, BART and spaCy used to be loaded at import time by several modules,
+each holding its own copy. Every model is now registered here once with a
+loader and loaded on first use; all callers share the same instance. Load time
+and memory footprint are recorded per model and reported by ``status()``.
+
+``MODEL_QUANTIZATION=int8`` loads Whisper and BART on the CPU with dynamic int8
+quantization of their linear layers: weights are stored as int8 and activations
+are quantized on the fly, which cuts memory and speeds up CPU inference at a
+small cost in accuracy (``backend/quantization_report.py`` measures both).
+"""
+import os
+import time
+import threading
+
+try:
+    import psutil
+except ImportError:  # memory deltas are optional
+    psutil = None
+
+WHISPER_MODEL_NAME = os.getenv('WHISPER_MODEL', 'base')
+SUMMARIZER_MODEL_NAME = os.getenv('SUMMARIZER_MODEL', 'facebook/bart-large-cnn')
+SPACY_MODEL_NAME = os.getenv('SPACY_MODEL', 'en_core_web_sm')
+# "none" (fp32, default) or "int8" (dynamic int8 linear layers, CPU only)
+MODEL_QUANTIZATION = os.getenv('MODEL_QUANTIZATION', 'none').lower()
+QUANTIZATION_MODES = ('none', 'int8')
+if MODEL_QUANTIZATION not in QUANTIZATION_MODES:
+    raise ValueError(f'MODEL_QUANTIZATION must be one of {QUANTIZATION_MODES}, got {MODEL_QUANTIZATION!r}')
+
+
+def _rss_bytes():
+    return psutil.Process().memory_info().rss if psutil else None
+
+
+def _parameter_bytes(model):
+    """Size of a torch model's weights and buffers, or None for other objects."""
+    module = getattr(model, 'model', model)  # transformers pipelines wrap the module
+    if not hasattr(module, 'state_dict'):
+        return None
+    # The state dict also covers int8 packed weights, which are not parameters
+    tensors = {}
+    for value in module.state_dict().values():
+        for tensor in (value if isinstance(value, tuple) else (value,)):
+            if hasattr(tensor, 'element_size'):
+                tensors[tensor.data_ptr()] = tensor.numel() * tensor.element_size()  # tied weights count once
+    return sum(tensors.values())
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._stats = {}
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+        self._warmup = {'state': 'idle', 'error': None, 'started_at': None, 'finished_at': None}
+
+    def register(self, name, loader, description=None):
+        """Register ``loader()`` as the way to build model ``name``."""
+        with self._registry_lock:
+            self._loaders[name] = (loader, description or name)
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        """Return model ``name``, loading it on first use (once per process)."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f'Unknown model: {name}')
+        with self._locks[name]:
+            if name not in self._models:
+                loader, description = self._loaders[name]
+                rss_before = _rss_bytes()
+                start_time = time.time()
+                model = loader()
+                load_seconds = time.time() - start_time
+                rss_after = _rss_bytes()
+                parameter_bytes = _parameter_bytes(model)
+                self._stats[name] = {
+                    'description': description,
+                    'load_seconds': round(load_seconds, 2),
+                    'loaded_at': time.time(),
+                    'rss_delta_mb': round((rss_after - rss_before) / (1024 * 1024), 1) if rss_before is not None else None,
+                    'parameter_mb': round(parameter_bytes / (1024 * 1024), 1) if parameter_bytes else None,
+                    'quantization': MODEL_QUANTIZATION if name in QUANTIZABLE_MODELS else None,
+                }
+                self._models[name] = model
+                print(f'Loaded model {name} ({description}) in {load_seconds:.2f}s')
+            return self._models[name]
+
+    def warm_up(self, names=None):
+        """Load ``names`` (default: every registered model) now, recording progress."""
+        names = list(names or self._loaders)
+        self._warmup.update(state='warming', error=None, started_at=time.time(), finished_at=None)
+        try:
+            for name in names:
+                self.get(name)
+        except Exception as e:
+            self._warmup.update(state='failed', error=f'{type(e).__name__}: {e}', finished_at=time.time())
+            print(f'Model warm-up failed: {e}')
+            return False
+        self._warmup.update(state='ready', finished_at=time.time())
+        return True
+
+    def warm_up_in_background(self, names=None):
+        """Run ``warm_up`` on a daemon thread so the server can start serving at once."""
+        self._warmup['state'] = 'warming'
+        thread = threading.Thread(target=self.warm_up, args=(names,), name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def warmup_status(self):
+        return dict(self._warmup)
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def status(self):
+        """Load state, load time and memory footprint of every registered model."""
+        with self._registry_lock:
+            names = list(self._loaders)
+        status = {}
+        for name in names:
+            status[name] = {'loaded': name in self._models, 'description': self._loaders[name][1]}
+            status[name].update(self._stats.get(name, {}))
+        return status
+
+
+def quantize_int8(module, linear_types=()):
+    """
+    Dynamically quantize every ``nn.Linear`` of ``module`` to int8 (CPU only).
+
+    ``linear_types`` are ``nn.Linear`` subclasses whose fp32 forward is the same
+    as the base class; they are treated as plain linear layers so they get
+    quantized too instead of being skipped.
+    """
+    import torch
+    for child in module.modules():
+        if type(child) in linear_types:
+            child.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_whisper_model(name=WHISPER_MODEL_NAME, quantization=MODEL_QUANTIZATION):
+    import whisper
+    if quantization != 'int8':
+        return whisper.load_model(name)
+    import whisper.model
+    model = whisper.load_model(name, device='cpu')
+    # whisper.model.Linear only casts weights to the input dtype, a no-op in fp32
+    return quantize_int8(model, linear_types=(whisper.model.Linear,))
+
+
+def load_summarizer_pipeline(name=SUMMARIZER_MODEL_NAME, quantization=MODEL_QUANTIZATION):
+    import torch
+    from transformers import pipeline
+    if quantization != 'int8':
+        return pipeline('summarization', model=name, device=0 if torch.cuda.is_available() else -1)
+    summarizer = pipeline('summarization', model=name, device=-1)
+    summarizer.model = quantize_int8(summarizer.model)
+    return summarizer
+
+
+def _load_whisper():
+    return load_whisper_model()
+
+
+def _load_summarizer():
+    return load_summarizer_pipeline()
+
+
+def _load_spacy():
+    import spacy
+    return spacy.load(SPACY_MODEL_NAME)
+
+
+QUANTIZABLE_MODELS = ('whisper', 'summarizer')
+_suffix = ' (int8)' if MODEL_QUANTIZATION == 'int8' else ''
+
+registry = ModelRegistry()
+registry.register('whisper', _load_whisper, f'whisper {WHISPER_MODEL_NAME}{_suffix}')
+registry.register('summarizer', _load_summarizer, f'{SUMMARIZER_MODEL_NAME}{_suffix}')
+registry.register('spacy', _load_spacy, SPACY_MODEL_NAME)
+
+
+def get_model(name):
+    return registry.get(name)
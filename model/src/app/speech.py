@@ -1,36 +1,73 @@
 import math
-import io
 import os
+import sys
 from os import mkdir, path, remove
 from subprocess import PIPE, Popen
+from threading import BoundedSemaphore, Lock, Thread
 from time import time
-import wave
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from json import loads
-from multiprocessing import cpu_count
+from multiprocessing import cpu_count, get_context
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
 from vosk import KaldiRecognizer as Recognizer, Model, GpuInit  # , BatchModel
-from pydub import AudioSegment
-from soundfile import SoundFile
+
+from .word_timeline import WordTimeline
 
 
 # Load VOSK models
 MODEL_PATH = os.path.join(os.path.dirname(__file__), '../../files/models/en')
 MODEL_PATH = os.path.abspath(MODEL_PATH)
-model = Model(MODEL_PATH)
+
+# Recognition engine: "process" runs segments on a pool of worker processes, each
+# holding its own Model, so recognition is not serialized by the GIL; "thread"
+# runs them on threads sharing this process's Model
+VOSK_ENGINE = os.getenv('VOSK_ENGINE', 'process')
+# Upper bound on parallel recognizers (threads or worker processes)
+VOSK_WORKERS = int(os.getenv('VOSK_WORKERS', str(max(1, min(4, cpu_count())))))
+# Segments queued or running on the worker pool at once, across all requests;
+# further submissions block until a slot frees up
+VOSK_MAX_IN_FLIGHT = int(os.getenv('VOSK_MAX_IN_FLIGHT', str(2 * VOSK_WORKERS)))
+# Recycle a worker after this many segments to return its memory (0: never, Python 3.11+)
+VOSK_MAX_TASKS_PER_CHILD = int(os.getenv('VOSK_MAX_TASKS_PER_CHILD', '0'))
+# Segments per worker; more, shorter segments balance load better now that cuts
+# land in pauses and overlaps are deduplicated
+VOSK_SEGMENTS_PER_WORKER = int(os.getenv('VOSK_SEGMENTS_PER_WORKER', '2'))
+VOSK_MIN_SEGMENT_SECONDS = float(os.getenv('VOSK_MIN_SEGMENT_SECONDS', '30'))
+# Audio shared by neighbouring segments on each side of a cut, so a word the
+# cut could not avoid is heard whole by one of them
+VOSK_SEGMENT_OVERLAP_SECONDS = float(os.getenv('VOSK_SEGMENT_OVERLAP_SECONDS', '1.0'))
+# Cuts move to the quietest RMS window within this many seconds of the even split
+BOUNDARY_SEARCH_SECONDS = 2.0
+RMS_WINDOW_SECONDS = 0.02
+
+_model = None
+_model_lock = Lock()
+
+
+def get_vosk_model():
+    """The VOSK model of this process, loaded on first use (once per worker)."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = Model(MODEL_PATH)
+        return _model
+
+
+def __getattr__(name):
+    # Keeps ``speech.model`` working without loading the model at import
+    if name == 'model':
+        return get_vosk_model()
+    raise AttributeError(name)
 
 def extract_audio(_bytes, file_info):
     # already and audio file
     if 'audio/wav' in file_info.mime:
         try:
-            wave_file = SoundFile(io.BytesIO(_bytes))
-
-            sample_rate = wave_file.samplerate
-            bit_depth = wave_file.subtype
-            channels = wave_file.channels
+            _, sample_rate, channels, sample_width = parse_wav(_bytes)
 
-            wave_file.close()
-
-            if sample_rate == 16000 and bit_depth == 'PCM_16' and channels == 1:
+            if sample_rate == 16000 and sample_width == 2 and channels == 1:
                 return _bytes
         except Exception as e:  # audio file not matching training wav specs, fallback to conversion
             print(f'File format mismatch :{e}\nConverting...')
@@ -51,78 +88,380 @@ def extract_audio(_bytes, file_info):
     return converted_bytes
 
 
-def transcribe(audio_bytes):
-    segments = split_audio(audio_bytes, cpu_count())
+# Bytes of 16 kHz 16-bit mono PCM handed to the recognizer at a time (4000 frames, as in transcribe_segment)
+STREAM_READ_BYTES = 8000
+
+
+def _feed_process(process, chunks, feed_errors):
+    """Write ``chunks`` to ffmpeg's stdin, then close it so ffmpeg flushes and exits."""
+    try:
+        for chunk in chunks:
+            process.stdin.write(chunk)
+    except (BrokenPipeError, ValueError):
+        pass  # ffmpeg exited early or the stream was closed
+    except Exception as e:
+        # Reading the input failed (e.g. it exceeded a size limit); stop decoding
+        feed_errors.append(e)
+        process.kill()
+    finally:
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+
+def transcribe_stream(chunks):
+    """
+    Transcribe audio or video while it is still arriving.
+
+    ``chunks`` is an iterable of raw container bytes (e.g. a request body read in
+    pieces); an exception raised while iterating it is re-raised here. A feeder
+    thread writes the chunks to ffmpeg's stdin while ffmpeg's 16 kHz mono PCM
+    output is passed to the recognizer as it is produced, so the first words are
+    recognized before the input has been fully read and nothing is written to
+    disk. Inputs that need seeking (MP4 with the index at the end)
+    cannot be decoded from a pipe and end with an ``error`` event.
+
+    Yields:
+        dict: ``{'event': 'partial', 'text'}`` while a phrase is being spoken,
+        ``{'event': 'result', 'text', 'words'}`` for each finished phrase and a
+        closing ``{'event': 'final', 'transcript'}`` or ``{'event': 'error', 'description'}``.
+    """
+    process = Popen(['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', 'pipe:0', '-vn',
+                     '-ac', '1', '-ar', '16000', '-f', 's16le', '-acodec', 'pcm_s16le', 'pipe:1'],
+                    stdin=PIPE, stdout=PIPE, stderr=PIPE)
+    errors, feed_errors = [], []
+    feeder = Thread(target=_feed_process, args=(process, chunks, feed_errors), daemon=True)
+    # stderr is drained on its own thread so a chatty ffmpeg never blocks on a full pipe
+    drainer = Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+    feeder.start()
+    drainer.start()
+
+    rec = Recognizer(get_vosk_model(), 16000)
+    rec.SetWords(True)
+    transcription = ''
+    last_partial = ''
+    received_audio = False
+    try:
+        while True:
+            frames = process.stdout.read(STREAM_READ_BYTES)
+            if not frames:
+                break
+            received_audio = True
+            if rec.AcceptWaveform(frames):
+                text, words = process_recognizer_result(rec.Result())
+                last_partial = ''
+                if text:
+                    transcription += text
+                    yield {'event': 'result', 'text': text.strip(), 'words': words}
+            else:
+                partial = loads(rec.PartialResult()).get('partial', '')
+                if partial and partial != last_partial:
+                    last_partial = partial
+                    yield {'event': 'partial', 'text': partial}
+
+        process.wait()
+        drainer.join()
+        feeder.join()
+        if feed_errors:
+            raise feed_errors[0]
+        if process.returncode != 0 and not received_audio:
+            message = b''.join(errors).decode(errors='ignore').strip()
+            yield {'event': 'error', 'description': message or 'The input could not be decoded.'}
+            return
+
+        text, words = process_recognizer_result(rec.FinalResult())
+        if text:
+            transcription += text
+            yield {'event': 'result', 'text': text.strip(), 'words': words}
+        yield {'event': 'final', 'transcript': transcription}
+    finally:
+        # Also reached when the client disconnects and the generator is closed
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        feeder.join(timeout=1)
+
+
+class ThreadEngine:
+    """Recognizes segments on threads sharing this process's Model."""
+
+    def __init__(self, num_workers=VOSK_WORKERS):
+        self.num_workers = num_workers
+
+    def transcribe_segments(self, segments):
+        with ThreadPoolExecutor(min(len(segments), self.num_workers)) as pool:
+            return list(pool.map(transcribe_segment, segments))
+
+
+def _attach_shared_memory(name):
+    try:
+        return SharedMemory(name=name, track=False)  # Python 3.13+: the parent owns the block
+    except TypeError:
+        return SharedMemory(name=name)
+
+
+def _transcribe_shared_segment(shm_name, start, end, offset_seconds):
+    """Worker side: recognize bytes ``start``..``end`` of the shared PCM block."""
+    shm = _attach_shared_memory(shm_name)
+    try:
+        pcm = shm.buf[start:end]
+        try:
+            return transcribe_segment({'pcm': pcm, 'offset_seconds': offset_seconds})
+        finally:
+            pcm.release()
+    finally:
+        shm.close()
+
+
+class ProcessEngine:
+    """
+    Recognizes segments on a bounded pool of worker processes.
+
+    Every worker loads the Model once when it starts. The PCM of a request is
+    copied once into shared memory and workers read their segment from it, so
+    audio is never pickled. At most ``max_in_flight`` segments are queued or
+    running at a time across all requests; callers beyond that wait, which keeps
+    memory bounded under load instead of queueing unbounded work.
+    """
+
+    def __init__(self, num_workers=VOSK_WORKERS, max_in_flight=VOSK_MAX_IN_FLIGHT,
+                 max_tasks_per_child=VOSK_MAX_TASKS_PER_CHILD):
+        self.num_workers = num_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self._slots = BoundedSemaphore(max(max_in_flight, 1))
+        self._executor = None
+        self._lock = Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                options = {}
+                if self.max_tasks_per_child and sys.version_info >= (3, 11):
+                    options['max_tasks_per_child'] = self.max_tasks_per_child
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    mp_context=get_context('spawn'),
+                    initializer=get_vosk_model,
+                    **options
+                )
+            return self._executor
+
+    def _submit(self, executor, *args):
+        self._slots.acquire()
+        try:
+            future = executor.submit(_transcribe_shared_segment, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def transcribe_segments(self, segments):
+        # Segments overlap and all slice the same PCM, which is copied in once
+        source = segments[0]['source']
+        shm = SharedMemory(create=True, size=max(len(source), 1))
+        futures = []
+        try:
+            shm.buf[:len(source)] = source
+            tasks = [(shm.name, segment['pcm_start'], segment['pcm_start'] + len(segment['pcm']),
+                      segment['offset_seconds']) for segment in segments]
+            executor = self._get_executor()
+            for task in tasks:
+                futures.append(self._submit(executor, *task))
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool next time
+            with self._lock:
+                self._executor = None
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+_engine = None
+_engine_lock = Lock()
+
+
+def get_engine():
+    """The process-wide recognition engine selected by VOSK_ENGINE."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            if VOSK_ENGINE == 'process':
+                _engine = ProcessEngine()
+            elif VOSK_ENGINE == 'thread':
+                _engine = ThreadEngine()
+            else:
+                raise ValueError(f"Unknown VOSK_ENGINE: {VOSK_ENGINE}")
+        return _engine
+
 
-    with ThreadPoolExecutor(len(segments)) as pool:
-        results = pool.map(transcribe_segment, segments)
+def transcribe(audio_bytes, engine=None):
+    """
+    Transcribe a 16 kHz mono 16-bit WAV.
 
-        final_result = {'transcript': ''}
-        for result in results:
-            final_result['transcript'] += result['transcript']
+    Args:
+        audio_bytes: The WAV file.
+        engine: ``ThreadEngine`` or ``ProcessEngine``; defaults to ``get_engine()``.
 
-        return final_result
+    Returns:
+        dict: ``transcript`` text and ``words``, a ``WordTimeline`` of every
+        recognized word with times relative to the start of the recording.
+    """
+    engine = engine or get_engine()
+    segments = split_audio(audio_bytes, engine.num_workers * VOSK_SEGMENTS_PER_WORKER)
+    results = engine.transcribe_segments(segments)
 
+    # Neighbouring segments both hear the overlap around a cut; each word is kept
+    # only from the segment whose own span contains its midpoint
+    timelines = [result['words'].clip(segment['keep_from'], segment['keep_until'])
+                 for result, segment in zip(results, segments)]
 
-def split_audio(audio_bytes, num_segments, minimum_segment_duration=60):
-    audio_pydub = AudioSegment.from_wav(io.BytesIO(audio_bytes))
-    total_seconds = audio_pydub.duration_seconds
+    words = WordTimeline.merge(timelines)
+    return {'transcript': words.text(), 'words': words}
+
+
+def parse_wav(audio_bytes):
+    """
+    Locate the PCM samples inside a WAV file without copying them.
+
+    Walks the RIFF chunks instead of using ``wave``/pydub, so a one-hour file is
+    never decoded or duplicated. ffmpeg writes placeholder sizes when it streams
+    a WAV to a pipe, so a data chunk running past the end is clamped to the file.
+
+    Returns:
+        tuple: (memoryview of the PCM bytes, sample_rate, channels, sample_width)
+    """
+    view = memoryview(audio_bytes)
+    if bytes(view[0:4]) != b'RIFF' or bytes(view[8:12]) != b'WAVE':
+        raise ValueError('Not a RIFF/WAVE file')
+    fmt = None
+    position = 12
+    while position + 8 <= len(view):
+        chunk_id = bytes(view[position:position + 4])
+        chunk_size = int.from_bytes(view[position + 4:position + 8], 'little')
+        body = position + 8
+        if chunk_id == b'fmt ':
+            channels = int.from_bytes(view[body + 2:body + 4], 'little')
+            sample_rate = int.from_bytes(view[body + 4:body + 8], 'little')
+            bits_per_sample = int.from_bytes(view[body + 14:body + 16], 'little')
+            fmt = (sample_rate, channels, bits_per_sample // 8)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError('WAV data chunk precedes its fmt chunk')
+            end = min(body + chunk_size, len(view))
+            frame_bytes = fmt[1] * fmt[2]
+            end -= (end - body) % frame_bytes  # drop a trailing partial frame
+            return (view[body:end],) + fmt
+        position = body + chunk_size + (chunk_size & 1)  # chunks are word aligned
+    raise ValueError('WAV file has no data chunk')
+
+
+def quietest_frame(samples, center, sample_rate=16000, search_seconds=BOUNDARY_SEARCH_SECONDS,
+                   window_seconds=RMS_WINDOW_SECONDS):
+    """
+    Frame index of the quietest window within ``search_seconds`` of ``center``.
+
+    ``samples`` is an int16 array (a view of the PCM); only the search range is
+    converted to float, and the RMS of all its windows is computed in one pass.
+    """
+    window = int(sample_rate * window_seconds)
+    start = max(0, center - int(sample_rate * search_seconds))
+    end = min(len(samples), center + int(sample_rate * search_seconds))
+    num_windows = (end - start) // window
+    if num_windows < 2:
+        return center
+    windows = samples[start:start + num_windows * window].astype(np.float32).reshape(num_windows, window)
+    rms = np.sqrt(np.einsum('ij,ij->i', windows, windows) / window)
+    # The middle of the quietest window, so the cut sits inside the pause
+    return start + int(np.argmin(rms)) * window + window // 2
+
+
+def split_audio(audio_bytes, num_segments, minimum_segment_duration=VOSK_MIN_SEGMENT_SECONDS,
+                overlap_seconds=VOSK_SEGMENT_OVERLAP_SECONDS):
+    """
+    Split a 16 kHz mono 16-bit WAV into at most ``num_segments`` PCM slices.
+
+    Cut points start at even intervals and are moved to the quietest 20 ms
+    window nearby, so they fall between words. Each slice also reaches
+    ``overlap_seconds`` past its cuts; ``keep_from``/``keep_until`` give the
+    part of the recording (in seconds) a segment's words are kept for, see
+    ``transcribe``; ``source`` and ``pcm_start`` locate the slice in the PCM. Segments are ``memoryview`` slices of ``audio_bytes``, so no
+    samples are copied or re-encoded.
+    """
+    pcm, sample_rate, channels, sample_width = parse_wav(audio_bytes)
+    if (sample_rate, channels, sample_width) != (16000, 1, 2):
+        raise ValueError(f'Expected 16 kHz mono 16-bit PCM, got {sample_rate} Hz, '
+                         f'{channels} channel(s), {sample_width * 8}-bit')
+    frame_bytes = channels * sample_width
+    total_frames = len(pcm) // frame_bytes
+    total_seconds = total_frames / sample_rate
 
     max_num_segments = math.floor(total_seconds / minimum_segment_duration)
     num_segments = max_num_segments if max_num_segments < num_segments else num_segments
 
     if num_segments <= 1:
         return [{
-            'bytes': audio_bytes,
-            'offset_seconds': 0
+            'pcm': pcm,
+            'source': pcm,
+            'pcm_start': 0,
+            'offset_seconds': 0,
+            'keep_from': 0,
+            'keep_until': math.inf
         }]
 
-    segment_seconds = total_seconds / num_segments
+    samples = np.frombuffer(pcm, dtype='<i2')  # a view, not a copy
+    segment_frames = total_frames // num_segments
+    cuts = [0] + [quietest_frame(samples, i * segment_frames, sample_rate) for i in range(1, num_segments)]
+    cuts.append(total_frames)
+    overlap_frames = int(overlap_seconds * sample_rate)
 
     segments = []
-    start_seconds = 0
-    for i in range(num_segments):
-        end_seconds = start_seconds + segment_seconds
-
-        with io.BytesIO() as bytesio:
-            audio_pydub_segment = \
-                audio_pydub[start_seconds * 1000:end_seconds * 1000] if i < num_segments - 1 \
-                    else audio_pydub[start_seconds * 1000:]
-
-            audio_pydub_segment.export(bytesio, format='wav')
-            bytesio.seek(0)
-            segments.append({
-                'bytes': bytesio.read(),
-                'offset_seconds': start_seconds
-            })
-
-        start_seconds += segment_seconds
+    for i, (cut_start, cut_end) in enumerate(zip(cuts, cuts[1:])):
+        start_frame = max(0, cut_start - overlap_frames)
+        end_frame = min(total_frames, cut_end + overlap_frames)
+        segments.append({
+            'pcm': pcm[start_frame * frame_bytes:end_frame * frame_bytes],
+            'source': pcm,
+            'pcm_start': start_frame * frame_bytes,
+            'offset_seconds': start_frame / sample_rate,
+            'keep_from': cut_start / sample_rate if i > 0 else 0,
+            'keep_until': cut_end / sample_rate if i < num_segments - 1 else math.inf
+        })
 
     return segments
 
 
 def transcribe_segment(segment):
-    rec = Recognizer(model, 16000)
+    rec = Recognizer(get_vosk_model(), 16000)
     rec.SetWords(True)
     transcription = ''
     word_bounds = []
-    with io.BytesIO(segment['bytes']) as bytesio, wave.open(bytesio, 'rb') as wav:
-        while True:
-            frames = wav.readframes(4000)
-            no_more_frames = len(frames) == 0
-            recognizer_result = None
-            if no_more_frames:
-                recognizer_result = rec.FinalResult()
-            elif rec.AcceptWaveform(frames):
-                recognizer_result = rec.Result()
-            if recognizer_result:
-                partial_transcript, partial_word_bounds = process_recognizer_result(recognizer_result)
-                transcription += partial_transcript
-                word_bounds += partial_word_bounds
-            if no_more_frames:
-                break
+    pcm = segment['pcm']
+    # 4000 frames at a time; vosk's C binding takes bytes, so only each small chunk is copied
+    for start in range(0, len(pcm), STREAM_READ_BYTES):
+        if rec.AcceptWaveform(bytes(pcm[start:start + STREAM_READ_BYTES])):
+            partial_transcript, partial_word_bounds = process_recognizer_result(rec.Result())
+            transcription += partial_transcript
+            word_bounds += partial_word_bounds
+    partial_transcript, partial_word_bounds = process_recognizer_result(rec.FinalResult())
+    transcription += partial_transcript
+    word_bounds += partial_word_bounds
 
-    return {'transcript': transcription}
+    # VOSK times are relative to the segment; shift them onto the recording's clock
+    return {'transcript': transcription, 'words': WordTimeline.from_vosk(word_bounds, segment['offset_seconds'])}
 
 
 def process_recognizer_result(result):
@@ -1,8 +1,27 @@
-from transformers import pipeline
-import torch
+import os
+import re
 
-# Initialize the summarization pipeline
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn", device=0 if torch.cuda.is_available() else -1)
+from .model_registry import get_model
+
+# Chunks summarized per forward pass; larger batches trade memory for throughput
+SUMMARY_BATCH_SIZE = int(os.getenv('SUMMARY_BATCH_SIZE', '4'))
+# Tokens carried over from the end of one chunk into the next to keep context
+CHUNK_OVERLAP_TOKENS = int(os.getenv('SUMMARY_CHUNK_OVERLAP_TOKENS', '0'))
+
+def get_summarizer():
+    """The shared summarization pipeline, loaded on first use."""
+    return get_model('summarizer')
+
+def __getattr__(name):
+    # Keeps ``from summarizer import summarizer`` working without loading BART at import
+    if name == 'summarizer':
+        return get_summarizer()
+    raise AttributeError(name)
+
+def max_chunk_tokens():
+    """Token budget of one model input (BART: 1024 including <s> and </s>)."""
+    tokenizer = get_summarizer().tokenizer
+    return min(tokenizer.model_max_length, 1024) - tokenizer.num_special_tokens_to_add()
 
 def chunk_text(text, max_length=1000):
     """Split text into chunks of approximately max_length characters."""
@@ -25,22 +44,88 @@ def chunk_text(text, max_length=1000):
     
     return chunks
 
+def _token_lengths(texts):
+    # Sentences follow a space inside a chunk, which changes BPE tokens at the start
+    encoded = get_summarizer().tokenizer([' ' + text for text in texts], add_special_tokens=False)
+    return [len(ids) for ids in encoded['input_ids']]
+
+def _split_long_sentence(sentence, max_tokens):
+    tokenizer = get_summarizer().tokenizer
+    ids = tokenizer(' ' + sentence, add_special_tokens=False)['input_ids']
+    return [tokenizer.decode(ids[i:i + max_tokens]).strip() for i in range(0, len(ids), max_tokens)]
+
+def chunk_text_by_tokens(text, max_tokens=None, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Pack whole sentences into chunks of at most ``max_tokens`` model tokens.
+
+    Sentences longer than the budget are split at token boundaries. With
+    ``overlap_tokens`` the trailing sentences of a chunk (up to that many
+    tokens) are repeated at the start of the next one.
+    """
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', text) if s.strip()]
+    if not sentences:
+        return []
+    max_tokens = max_tokens or max_chunk_tokens()
+
+    pieces = []
+    for sentence, length in zip(sentences, _token_lengths(sentences)):
+        if length <= max_tokens:
+            pieces.append((sentence, length))
+        else:
+            parts = _split_long_sentence(sentence, max_tokens)
+            pieces.extend(zip(parts, _token_lengths(parts)))
+
+    chunks, current, current_tokens = [], [], 0
+    for sentence, length in pieces:
+        if current and current_tokens + length > max_tokens:
+            chunks.append(' '.join(s for s, _ in current))
+            carried, carried_tokens = [], 0
+            for previous, previous_length in reversed(current):
+                if carried_tokens + previous_length > overlap_tokens or \
+                        carried_tokens + previous_length + length > max_tokens:
+                    break
+                carried.insert(0, (previous, previous_length))
+                carried_tokens += previous_length
+            current, current_tokens = carried, carried_tokens
+        current.append((sentence, length))
+        current_tokens += length
+    if current:
+        chunks.append(' '.join(s for s, _ in current))
+    return chunks
+
+def _summarize_batch(texts, max_length):
+    """Summarize several texts in padded batches of SUMMARY_BATCH_SIZE."""
+    results = get_summarizer()(texts, batch_size=SUMMARY_BATCH_SIZE, max_length=max_length,
+                         min_length=30, do_sample=False, truncation=True)
+    return [result['summary_text'] for result in results]
+
+def _group_summaries(summaries, max_tokens=None):
+    """Pack consecutive summaries into groups that fit one model input."""
+    max_tokens = max_tokens or max_chunk_tokens()
+    groups, group, length = [], [], 0
+    for summary, summary_tokens in zip(summaries, _token_lengths(summaries)):
+        # At least two per group, so every reduce pass shrinks the list
+        if len(group) >= 2 and length + summary_tokens > max_tokens:
+            groups.append(' '.join(group))
+            group, length = [], 0
+        group.append(summary)
+        length += summary_tokens
+    if group:
+        groups.append(' '.join(group))
+    return groups
+
 def summarize_text(text, max_length=150):
     """Summarize text by first chunking it if necessary."""
-    # Split text into chunks if it's too long
-    chunks = chunk_text(text)
-    
-    # Summarize each chunk
-    summaries = []
-    for chunk in chunks:
-        summary = summarizer(chunk, max_length=max_length, min_length=30, do_sample=False)
-        summaries.append(summary[0]['summary_text'])
+    # Split text into chunks that fill the model's token window
+    chunks = chunk_text_by_tokens(text)
+    if not chunks:
+        return ''
     
-    # If we only have one chunk, return its summary
-    if len(summaries) == 1:
-        return summaries[0]
+    # Summarize all chunks in batches instead of one forward pass per chunk
+    summaries = _summarize_batch(chunks, max_length)
     
-    # If we have multiple chunks, combine their summaries and summarize again
-    combined_summary = ' '.join(summaries)
-    final_summary = summarizer(combined_summary, max_length=max_length, min_length=30, do_sample=False)
-    return final_summary[0]['summary_text']
+    # Reduce hierarchically: summarize groups of summaries until one remains,
+    # so even dozens of chunk summaries never overflow the model's input window
+    while len(summaries) > 1:
+        summaries = _summarize_batch(_group_summaries(summaries), max_length)
+    return summaries[0]
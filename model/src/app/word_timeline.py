@@ -0,0 +1,124 @@
+"""
+Compact word-level timeline of a transcript.
+
+VOSK reports every recognized word as a small dict, which for an hour-long
+lecture is tens of thousands of Python objects. The timeline keeps the same
+information in parallel arrays: float32 start/end times and confidences, and
+int32 indices into a table of distinct words. Times are absolute seconds from
+the start of the recording, so lecture seek and clip search can look words up
+with a binary search instead of re-running recognition.
+"""
+import numpy as np
+
+
+class WordTimeline:
+    def __init__(self, vocabulary=None, word_ids=None, starts=None, ends=None, confidences=None):
+        self.vocabulary = list(vocabulary or [])
+        self.word_ids = np.asarray(word_ids if word_ids is not None else [], dtype=np.int32)
+        self.starts = np.asarray(starts if starts is not None else [], dtype=np.float32)
+        self.ends = np.asarray(ends if ends is not None else [], dtype=np.float32)
+        self.confidences = np.asarray(
+            confidences if confidences is not None else np.ones(len(self.word_ids)), dtype=np.float32
+        )
+
+    @classmethod
+    def from_vosk(cls, word_bounds, offset_seconds=0.0):
+        """Build a timeline from VOSK ``result`` entries, shifted by ``offset_seconds``."""
+        vocabulary, index = [], {}
+        word_ids = np.empty(len(word_bounds), dtype=np.int32)
+        for i, bound in enumerate(word_bounds):
+            word = bound['word']
+            if word not in index:
+                index[word] = len(vocabulary)
+                vocabulary.append(word)
+            word_ids[i] = index[word]
+        starts = np.fromiter((bound['start'] for bound in word_bounds), dtype=np.float64, count=len(word_bounds))
+        ends = np.fromiter((bound['end'] for bound in word_bounds), dtype=np.float64, count=len(word_bounds))
+        confidences = np.fromiter((bound.get('conf', 1.0) for bound in word_bounds), dtype=np.float32,
+                                  count=len(word_bounds))
+        # Offsets are added in float64 before narrowing, so late words keep millisecond precision
+        return cls(vocabulary, word_ids, starts + offset_seconds, ends + offset_seconds, confidences)
+
+    @classmethod
+    def merge(cls, timelines):
+        """Concatenate timelines into one ordered by start time, unifying their word tables."""
+        vocabulary, index = [], {}
+        word_ids = []
+        for timeline in timelines:
+            remap = np.empty(len(timeline.vocabulary), dtype=np.int32)
+            for i, word in enumerate(timeline.vocabulary):
+                if word not in index:
+                    index[word] = len(vocabulary)
+                    vocabulary.append(word)
+                remap[i] = index[word]
+            word_ids.append(remap[timeline.word_ids])
+        if not word_ids:
+            return cls()
+        starts = np.concatenate([timeline.starts for timeline in timelines])
+        order = np.argsort(starts, kind='stable')
+        return cls(
+            vocabulary,
+            np.concatenate(word_ids)[order],
+            starts[order],
+            np.concatenate([timeline.ends for timeline in timelines])[order],
+            np.concatenate([timeline.confidences for timeline in timelines])[order],
+        )
+
+    def clip(self, start_seconds, end_seconds):
+        """The words whose midpoint lies in ``[start_seconds, end_seconds)``."""
+        midpoints = (self.starts + self.ends) / 2
+        keep = (midpoints >= start_seconds) & (midpoints < end_seconds)
+        return WordTimeline(self.vocabulary, self.word_ids[keep], self.starts[keep], self.ends[keep],
+                            self.confidences[keep])
+
+    def __len__(self):
+        return len(self.word_ids)
+
+    @property
+    def words(self):
+        return [self.vocabulary[i] for i in self.word_ids]
+
+    def text(self, start=0, end=None):
+        """Transcript of the words with indices ``start``..``end``."""
+        return ' '.join(self.vocabulary[i] for i in self.word_ids[start:end])
+
+    def index_at(self, seconds):
+        """Index of the word being spoken at ``seconds`` (or the next one)."""
+        return int(np.searchsorted(self.ends, seconds, side='left'))
+
+    def window(self, start_seconds, end_seconds):
+        """Index range ``(start, end)`` of the words spoken between the two times."""
+        return self.index_at(start_seconds), int(np.searchsorted(self.starts, end_seconds, side='left'))
+
+    def find(self, phrase):
+        """
+        Occurrences of a phrase as ``(start_seconds, end_seconds)`` pairs.
+
+        Matching is on whole words, case-insensitively, as VOSK emits them.
+        """
+        index = {word: i for i, word in enumerate(self.vocabulary)}
+        targets = [index.get(word) for word in phrase.lower().split()]
+        if not targets or None in targets:
+            return []
+        length = len(targets)
+        if length > len(self):
+            return []
+        # Positions where the first word matches, narrowed by each following word
+        candidates = np.flatnonzero(self.word_ids[:len(self) - length + 1] == targets[0])
+        for offset, target in enumerate(targets[1:], 1):
+            candidates = candidates[self.word_ids[candidates + offset] == target]
+        return [(float(self.starts[i]), float(self.ends[i + length - 1])) for i in candidates]
+
+    def to_dict(self):
+        """JSON-serializable form; ``from_dict`` restores it."""
+        return {
+            'vocabulary': self.vocabulary,
+            'word_ids': self.word_ids.tolist(),
+            'starts': [round(float(t), 3) for t in self.starts],
+            'ends': [round(float(t), 3) for t in self.ends],
+            'confidences': [round(float(c), 3) for c in self.confidences],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['vocabulary'], data['word_ids'], data['starts'], data['ends'], data.get('confidences'))
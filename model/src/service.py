@@ -1,21 +1,27 @@
 from flask import Flask
 from flask_cors import CORS
 
-from src.apis.speech import speech_blueprint
-
 from waitress import serve
 
-app = Flask(__name__)
-            
-app.register_blueprint(speech_blueprint, url_prefix='/api')
-
-CORS(app)
 port = 20025
 
 
+def create_app():
+    # Built on demand rather than at import: the VOSK process pool spawns workers
+    # that re-import the main module, and they must not pull in the API modules
+    from src.apis.speech import speech_blueprint
+
+    app = Flask(__name__)
+
+    app.register_blueprint(speech_blueprint, url_prefix='/api')
+
+    CORS(app)
+    return app
+
+
 def run():
     serve(
-        app,
+        create_app(),
         host='0.0.0.0',
         port=port
     )
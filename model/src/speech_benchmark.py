@@ -0,0 +1,140 @@
+"""
+VOSK engine benchmark
+
+Transcribes one recording with the thread engine and the process engine at
+several worker counts and reports wall time, real-time factor, speedup over
+threads and memory. Every configuration runs in a fresh interpreter so model
+loading and peak RSS are measured in isolation. Run from the model directory:
+
+    python -m src.speech_benchmark --audio lecture.mp4 --workers 1 2 4 8 --repeats 3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+MODEL_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_wav(audio_path):
+    """Convert any audio/video file to the 16 kHz mono 16-bit WAV VOSK consumes."""
+    process = subprocess.run(
+        ['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', audio_path,
+         '-vn', '-ac', '1', '-ar', '16000', '-sample_fmt', 's16', '-f', 'wav', '-'],
+        capture_output=True, check=True
+    )
+    return process.stdout
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def _max_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(who).ru_maxrss / scale, 1)
+
+
+def run_configuration(audio_path, engine_name, workers, repeats):
+    """Measure one engine/worker count (runs in a child process)."""
+    from src.app import speech
+
+    audio_bytes = load_wav(audio_path)
+    pcm, sample_rate, channels, sample_width = speech.parse_wav(audio_bytes)
+    audio_seconds = len(pcm) / (sample_rate * channels * sample_width)
+    del pcm
+
+    if engine_name == 'process':
+        engine = speech.ProcessEngine(num_workers=workers, max_in_flight=2 * workers)
+    else:
+        engine = speech.ThreadEngine(num_workers=workers)
+
+    # The first run includes pool start-up and model loading
+    start_time = time.perf_counter()
+    result = speech.transcribe(audio_bytes, engine)
+    first_seconds = time.perf_counter() - start_time
+
+    durations = []
+    for _ in range(max(1, repeats)):
+        start_time = time.perf_counter()
+        result = speech.transcribe(audio_bytes, engine)
+        durations.append(time.perf_counter() - start_time)
+    if engine_name == 'process':
+        engine.shutdown()  # workers must exit before their peak RSS is reported
+
+    seconds = median(durations)
+    return {
+        'engine': engine_name,
+        'workers': workers,
+        'audio_seconds': round(audio_seconds, 1),
+        'first_run_seconds': round(first_seconds, 2),
+        'seconds': round(seconds, 2),
+        'real_time_factor': round(seconds / audio_seconds, 4),
+        'words': len(result['words']),
+        'transcript': result['transcript'],
+        'max_rss_mb': _max_rss_mb(resource.RUSAGE_SELF),
+        'max_worker_rss_mb': _max_rss_mb(resource.RUSAGE_CHILDREN) if engine_name == 'process' else None,
+    }
+
+
+def spawn_configuration(audio_path, engine_name, workers, repeats):
+    command = [sys.executable, '-m', 'src.speech_benchmark', '--run-configuration', engine_name, str(workers),
+               '--audio', os.path.abspath(audio_path), '--repeats', str(repeats)]
+    process = subprocess.run(command, cwd=MODEL_ROOT, stdout=subprocess.PIPE, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f'{engine_name} engine with {workers} workers failed with exit code {process.returncode}')
+    return json.loads(process.stdout)
+
+
+def print_report(results):
+    print(f"{'engine':<9}{'workers':>8}{'first s':>10}{'median s':>10}{'RTF':>8}{'speedup':>9}"
+          f"{'max RSS MB':>12}{'worker MB':>11}{'same text':>11}")
+    threads = {result['workers']: result for result in results if result['engine'] == 'thread'}
+    for result in results:
+        baseline = threads.get(result['workers'])
+        speedup = baseline['seconds'] / result['seconds'] if baseline else None
+        same_text = baseline['transcript'] == result['transcript'] if baseline else None
+        print(f"{result['engine']:<9}{result['workers']:>8}{result['first_run_seconds']:>10.2f}"
+              f"{result['seconds']:>10.2f}{result['real_time_factor']:>8.3f}"
+              f"{(f'{speedup:.2f}x' if speedup else '-'):>9}{result['max_rss_mb']:>12}"
+              f"{str(result['max_worker_rss_mb'] or '-'):>11}{str(same_text if same_text is not None else '-'):>11}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the thread and process VOSK engines')
+    parser.add_argument('--audio', required=True, help='Audio or video file to transcribe')
+    parser.add_argument('--engines', nargs='+', default=['thread', 'process'], choices=['thread', 'process'])
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4], help='Worker counts to measure')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs after the first one')
+    parser.add_argument('--output', help='Write the results as JSON')
+    parser.add_argument('--run-configuration', nargs=2, metavar=('ENGINE', 'WORKERS'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_configuration:
+        engine_name, workers = args.run_configuration
+        stdout, sys.stdout = sys.stdout, sys.stderr  # keep VOSK's logging out of the JSON
+        json.dump(run_configuration(args.audio, engine_name, int(workers), args.repeats), stdout)
+        return 0
+
+    results = []
+    for workers in args.workers:
+        for engine_name in args.engines:
+            print(f'Measuring {engine_name} engine with {workers} workers...', file=sys.stderr)
+            results.append(spawn_configuration(args.audio, engine_name, workers, args.repeats))
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nResults written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
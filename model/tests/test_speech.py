@@ -0,0 +1,56 @@
+import io
+import os
+import sys
+import wave
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('vosk')
+
+from src.app import speech
+from src.app.word_timeline import WordTimeline
+
+SAMPLE_RATE = 16000
+# A word every 0.5 s over two minutes of audio
+WORDS = [(f'w{i}', i * 0.5 + 0.05, i * 0.5 + 0.45) for i in range(240)]
+
+
+class ScriptedEngine:
+    """Recognizes every word of WORDS heard whole by a segment, timed from the segment's start."""
+
+    num_workers = 2
+
+    def transcribe_segments(self, segments):
+        results = []
+        for segment in segments:
+            start = segment['offset_seconds']
+            end = start + len(segment['pcm']) / (2 * SAMPLE_RATE)
+            bounds = [{'word': word, 'start': word_start - start, 'end': word_end - start}
+                      for word, word_start, word_end in WORDS if word_start >= start and word_end <= end]
+            results.append({'transcript': '', 'words': WordTimeline.from_vosk(bounds, start)})
+        return results
+
+
+def _wav(seconds):
+    output = io.BytesIO()
+    with wave.open(output, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(b'\x00\x00' * int(seconds * SAMPLE_RATE))
+    return output.getvalue()
+
+
+def test_transcribe_merges_overlapping_segments_without_duplicates():
+    audio = _wav(120)
+    segments = speech.split_audio(audio, 4)
+    assert len(segments) == 4
+    assert all(segment['keep_until'] > segment['keep_from'] for segment in segments)
+
+    words = speech.transcribe(audio, engine=ScriptedEngine())['words']
+
+    assert words.words == [word for word, _, _ in WORDS]
+    assert words.starts.tolist() == pytest.approx([start for _, start, _ in WORDS], abs=1e-3)
+    assert words.ends.tolist() == pytest.approx([end for _, _, end in WORDS], abs=1e-3)
@@ -0,0 +1,70 @@
+import math
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app.word_timeline import WordTimeline
+
+
+def _bounds(words, step=0.5):
+    return [{'word': word, 'start': i * step, 'end': i * step + 0.4, 'conf': 1.0} for i, word in enumerate(words)]
+
+
+def test_from_vosk_shifts_times_onto_the_recording_clock():
+    timeline = WordTimeline.from_vosk(_bounds(['cell', 'wall']), offset_seconds=3600.0)
+    assert timeline.words == ['cell', 'wall']
+    assert timeline.starts.tolist() == pytest.approx([3600.0, 3600.5], abs=1e-3)
+    assert timeline.ends.tolist() == pytest.approx([3600.4, 3600.9], abs=1e-3)
+
+
+def test_merge_orders_segment_timelines_by_start_time():
+    # Segments can finish out of order; each one's times are relative to its own start
+    second = WordTimeline.from_vosk(_bounds(['of', 'the', 'cell']), offset_seconds=10.0)
+    first = WordTimeline.from_vosk(_bounds(['the', 'cell', 'wall']), offset_seconds=0.0)
+    merged = WordTimeline.merge([second, first])
+    assert merged.words == ['the', 'cell', 'wall', 'of', 'the', 'cell']
+    assert merged.starts.tolist() == pytest.approx([0.0, 0.5, 1.0, 10.0, 10.5, 11.0])
+    assert merged.find('the cell') == [pytest.approx((0.0, 0.9)), pytest.approx((10.5, 11.4))]
+
+
+def test_clip_keeps_each_overlapping_word_once():
+    # A cut at 5.0 s with 1 s of overlap: the first segment hears 0-6 s, the second 4-10 s
+    first = WordTimeline.from_vosk([
+        {'word': 'plants', 'start': 3.0, 'end': 3.5},
+        {'word': 'make', 'start': 4.2, 'end': 4.6},
+        {'word': 'sugar', 'start': 4.8, 'end': 5.4},  # straddles the cut; its midpoint is 5.1
+        {'word': 'from', 'start': 5.5, 'end': 5.8},
+    ], offset_seconds=0.0)
+    second = WordTimeline.from_vosk([
+        {'word': 'make', 'start': 0.2, 'end': 0.6},
+        {'word': 'sugar', 'start': 0.8, 'end': 1.4},
+        {'word': 'from', 'start': 1.5, 'end': 1.8},
+        {'word': 'light', 'start': 2.0, 'end': 2.5},
+    ], offset_seconds=4.0)
+    merged = WordTimeline.merge([first.clip(0, 5.0), second.clip(5.0, math.inf)])
+    assert merged.words == ['plants', 'make', 'sugar', 'from', 'light']
+    assert merged.starts.tolist() == pytest.approx([3.0, 4.2, 4.8, 5.5, 6.0])
+    assert merged.ends.tolist() == pytest.approx([3.5, 4.6, 5.4, 5.8, 6.5])
+
+
+def _timeline(words, offset_seconds=0.0):
+    bounds = [{'word': word, 'start': i * 0.5, 'end': i * 0.5 + 0.4, 'conf': 1.0} for i, word in enumerate(words)]
+    return WordTimeline.from_vosk(bounds, offset_seconds)
+
+
+def test_find_phrase_longer_than_timeline():
+    assert _timeline(['a', 'b']).find('a b a b') == []
+
+
+def test_find_phrase_at_end_of_timeline():
+    timeline = _timeline(['the', 'cell', 'wall', 'of', 'the', 'cell'])
+    assert timeline.find('of the cell') == [pytest.approx((1.5, 2.9))]
+    assert timeline.find('the cell') == [pytest.approx((0.0, 0.9)), pytest.approx((2.0, 2.9))]
+
+
+def test_find_phrase_equal_to_timeline():
+    timeline = _timeline(['a', 'b'])
+    assert len(timeline.find('a b')) == 1